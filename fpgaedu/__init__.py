@@ -1,6 +1,7 @@
 import sys
 import argparse
 
+import fpgaedu.events
 from fpgaedu.subcommands import ShellSubcommand
 
 SUBCOMMANDS = {
@@ -9,9 +10,20 @@ SUBCOMMANDS = {
 
 def create_main_parser():
     parser = argparse.ArgumentParser()
+    parser.add_argument('--profile',
+                        help='write the event timeline of all Vivado '
+                             'sessions to FILE on exit',
+                        metavar='FILE')
+    parser.add_argument('--profile-format',
+                        choices=fpgaedu.events.FORMATS,
+                        default=fpgaedu.events.FORMAT_CHROME,
+                        help='the format of the profile: chrome trace '
+                             '(default) or plain json')
     subparsers = parser.add_subparsers(dest="subcommand")
     for cmd_name, cmd_class in SUBCOMMANDS.items():
-        subparsers.add_parser(cmd_name, description=cmd_class.description)
+        subparser = subparsers.add_parser(cmd_name,
+                                          description=cmd_class.description)
+        cmd_class.add_arguments(subparser)
     return parser
 
 def main(argv=None):
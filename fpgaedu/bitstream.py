@@ -0,0 +1,166 @@
+import contextlib
+import mmap
+import os
+import re
+import struct
+import threading
+
+# Every .bit file starts with this length-prefixed field, followed by the
+# 16-bit constant 0x0001 after which the keyed header fields follow.
+HEADER_MAGIC = b'\x00\x09\x0f\xf0\x0f\xf0\x0f\xf0\x0f\xf0\x00\x00\x01'
+KEY_DESIGN_NAME = b'a'
+KEY_PART = b'b'
+KEY_DATE = b'c'
+KEY_TIME = b'd'
+KEY_PAYLOAD = b'e'
+
+class BitstreamError(Exception):
+    """
+    Error class representing an invalid or truncated bitstream file.
+    """
+    pass
+
+class PartMismatchError(BitstreamError):
+    """
+    Error class representing the case in which a bitstream was generated for
+    a different part than the device it is programmed onto.
+    """
+    def __init__(self, part, device):
+        super().__init__('bitstream for part %s does not match device %s'
+                         % (part, device))
+        self.part = part
+        self.device = device
+
+def _normalize_part(name):
+    # Device identifiers as reported by the hardware manager (e.g.
+    # xc7a100t_0) carry an index suffix, while parts stored in bitstream
+    # headers (e.g. 7a100tcsg324) lack the xc prefix and include the package.
+    name = name.lower()
+    name = re.sub(r'_\d+$', '', name)
+    if name.startswith('xc'):
+        name = name[2:]
+    return name
+
+class Bitstream:
+    """
+    Metadata of a .bit file as read from its header. The bitstream data itself
+    is only read from disk when requested through read().
+    """
+    def __init__(self, path, design_name, part, date, time, payload_offset,
+                 payload_length):
+        self.path = path
+        self.design_name = design_name
+        self.part = part
+        self.date = date
+        self.time = time
+        self.payload_offset = payload_offset
+        self.payload_length = payload_length
+
+    @classmethod
+    def parse(cls, buffer, path=None):
+        """
+        Parse the header of a bitstream in the provided buffer, raising a
+        BitstreamError if the header is invalid or the payload is truncated.
+        """
+        if buffer[:len(HEADER_MAGIC)] != HEADER_MAGIC:
+            raise BitstreamError('invalid bitstream header')
+
+        fields = {}
+        offset = len(HEADER_MAGIC)
+        try:
+            while True:
+                key = buffer[offset:offset + 1]
+                if not key:
+                    raise BitstreamError('truncated bitstream header')
+                if key == KEY_PAYLOAD:
+                    payload_length, = struct.unpack_from('>I', buffer, offset + 1)
+                    payload_offset = offset + 5
+                    break
+                if key not in (KEY_DESIGN_NAME, KEY_PART, KEY_DATE, KEY_TIME):
+                    raise BitstreamError('invalid bitstream header field %r' % key)
+                length, = struct.unpack_from('>H', buffer, offset + 1)
+                value = bytes(buffer[offset + 3:offset + 3 + length])
+                if len(value) != length:
+                    raise BitstreamError('truncated bitstream header')
+                fields[key] = value.rstrip(b'\x00').decode('ascii', 'replace')
+                offset += 3 + length
+        except struct.error as err:
+            raise BitstreamError('truncated bitstream header') from err
+
+        if payload_offset + payload_length != len(buffer):
+            raise BitstreamError('bitstream payload is %d bytes, expected %d'
+                                 % (len(buffer) - payload_offset, payload_length))
+
+        return cls(path, fields.get(KEY_DESIGN_NAME), fields.get(KEY_PART),
+                   fields.get(KEY_DATE), fields.get(KEY_TIME), payload_offset,
+                   payload_length)
+
+    def matches_device(self, device):
+        """
+        Return whether this bitstream's part corresponds to the provided
+        device identifier.
+        """
+        if self.part is None:
+            return False
+        return _normalize_part(self.part).startswith(_normalize_part(device))
+
+    def check_device(self, device):
+        """
+        Raise a PartMismatchError if this bitstream cannot be programmed onto
+        the provided device.
+        """
+        if not self.matches_device(device):
+            raise PartMismatchError(self.part, device)
+
+    def read(self):
+        """
+        Return the complete contents of the bitstream file.
+        """
+        with self.mapped() as buffer:
+            return bytes(buffer)
+
+    @contextlib.contextmanager
+    def mapped(self):
+        """
+        Context manager providing the complete contents of the bitstream file
+        as a read-only mmap.
+        """
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if len(buffer) != self.payload_offset + self.payload_length:
+                    raise BitstreamError('bitstream %s changed on disk' % self.path)
+                yield buffer
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def load(path):
+    """
+    Return the Bitstream for the .bit file at the provided path. The header is
+    read through an mmap, so that the payload is never copied, and parsed
+    metadata is cached until the file's modification time or size changes.
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError as err:
+        raise BitstreamError('cannot read bitstream %s' % path) from err
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        bitstream = _cache.get(key)
+    if bitstream is not None:
+        return bitstream
+
+    if stat.st_size == 0:
+        raise BitstreamError('empty bitstream %s' % path)
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            bitstream = Bitstream.parse(buffer, path=path)
+
+    with _cache_lock:
+        # Drop stale entries for this path before caching the new one
+        for stale_key in [k for k in _cache if k[0] == path]:
+            del _cache[stale_key]
+        _cache[key] = bitstream
+    return bitstream
@@ -0,0 +1,160 @@
+import collections
+import contextlib
+import json
+import math
+import threading
+import time
+
+FORMAT_JSON = 'json'
+FORMAT_CHROME = 'chrome'
+FORMATS = (FORMAT_JSON, FORMAT_CHROME)
+
+class EventLog:
+    """
+    Timeline of timestamped events. Events are either instants or spans with
+    a duration. Timestamps are recorded using a monotonic clock and exported
+    relative to the wall clock time at which the log was created. Only the
+    most recent max_events events are kept.
+    """
+    def __init__(self, name, max_events=10000):
+        self.name = name
+        self.events = collections.deque(maxlen=max_events)
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    def _append(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def record(self, name, category='session', **args):
+        """
+        Record an instant event.
+        """
+        self._append({
+            'name': name,
+            'category': category,
+            'time': time.perf_counter() - self._origin,
+            'duration': None,
+            'thread': threading.get_ident(),
+            'args': args
+        })
+
+    @contextlib.contextmanager
+    def span(self, name, category='session', **args):
+        """
+        Context manager recording a span event covering its block. The
+        yielded dict may be updated to add arguments to the event. If the
+        block raises, the exception's class name is added as the error
+        argument.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as err:
+            args['error'] = type(err).__name__
+            raise
+        finally:
+            self._append({
+                'name': name,
+                'category': category,
+                'time': start - self._origin,
+                'duration': time.perf_counter() - start,
+                'thread': threading.get_ident(),
+                'args': args
+            })
+
+    def find(self, name):
+        """
+        Return all events of the provided name.
+        """
+        with self._lock:
+            return [event for event in self.events if event['name'] == name]
+
+    def to_json(self):
+        """
+        Return this log as a JSON-serializable dict, with event times given in
+        seconds since the epoch.
+        """
+        with self._lock:
+            events = list(self.events)
+        return {
+            'name': self.name,
+            'events': [dict(event, time=self._wall_origin + event['time'])
+                       for event in events]
+        }
+
+    def to_chrome_trace(self, pid=0):
+        """
+        Return this log's events in the Chrome trace event format, as loaded
+        by chrome://tracing. Every log is shown as a separate process.
+        """
+        with self._lock:
+            events = list(self.events)
+        trace_events = [{
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {'name': self.name}
+        }]
+        for event in events:
+            trace_event = {
+                'name': event['name'],
+                'cat': event['category'],
+                'ts': (self._wall_origin + event['time']) * 1e6,
+                'pid': pid,
+                'tid': event['thread'],
+                'args': event['args']
+            }
+            if event['duration'] is None:
+                trace_event.update(ph='i', s='t')
+            else:
+                trace_event.update(ph='X', dur=event['duration'] * 1e6)
+            trace_events.append(trace_event)
+        return trace_events
+
+def percentiles(values, points=(50, 90, 99)):
+    """
+    Return a dict mapping each percentile point to the corresponding value
+    (nearest rank) of the provided values, or None if there are no values.
+    """
+    values = sorted(values)
+    result = {}
+    for point in points:
+        if not values:
+            result[point] = None
+        else:
+            rank = max(1, int(math.ceil(point / 100 * len(values))))
+            result[point] = values[rank - 1]
+    return result
+
+def startup_latencies(logs):
+    """
+    Return the startup latencies (in seconds) recorded in the provided logs.
+    Logs that have dropped their oldest events do not contribute.
+    """
+    return [event['args']['startup'] for log in logs
+            for event in log.find('ready')]
+
+def dump(logs, file, format=FORMAT_CHROME):
+    """
+    Write the provided logs to a file object in either the JSON or the Chrome
+    trace format, along with aggregate startup latency percentiles.
+    """
+    latency = {'p%d' % point: value for point, value
+               in percentiles(startup_latencies(logs)).items()}
+    if format == FORMAT_JSON:
+        data = {
+            'logs': [log.to_json() for log in logs],
+            'startupLatency': latency
+        }
+    elif format == FORMAT_CHROME:
+        data = {
+            'traceEvents': [event for pid, log in enumerate(logs)
+                            for event in log.to_chrome_trace(pid=pid)],
+            'displayTimeUnit': 'ms',
+            'otherData': {'startupLatency': latency}
+        }
+    else:
+        raise ValueError('unknown format %s' % format)
+    json.dump(data, file, indent=1)
@@ -0,0 +1,204 @@
+import concurrent.futures
+import threading
+
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+
+class FederationError(Exception):
+    """
+    Error class representing a failure to route a request to a lab host.
+    """
+    pass
+
+class UnknownBoardError(FederationError):
+    """
+    Error class representing the case in which no registered host owns the
+    requested board.
+    """
+    pass
+
+class Host:
+    """
+    A registered lab host: the session addressing its server application,
+    its last known inventory and a lock serializing calls to it.
+    """
+    def __init__(self, key, session):
+        self.key = key
+        self.session = session
+        self.inventory = {}
+        self.error = None
+        self.lock = threading.Lock()
+
+class Coordinator:
+    """
+    Coordinator of the Vivado sessions on several lab hosts. The coordinator
+    keeps an inventory of the targets and devices connected to every host and
+    routes requests for a board to the host owning it. Calls to a single host
+    are serialized, while calls to different hosts run concurrently, so that
+    throughput scales with the number of hosts.
+
+    Every call to a host times out after rpc_timeout seconds, so that a hung
+    host delays neither refreshes nor the hosts' callers indefinitely. The
+    inventory is only updated by refresh(), which start_refresh() calls
+    periodically.
+    """
+    def __init__(self, session_factory=fpgaedu.vivado.Session, max_workers=8,
+                 rpc_timeout=60):
+        self._session_factory = session_factory
+        self._max_workers = max_workers
+        self._rpc_timeout = rpc_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._refresh_stop = threading.Event()
+
+    def register(self, host, port):
+        """
+        Register the server application listening at host:port and return
+        its key. The host's inventory is empty until the next refresh.
+        """
+        key = '%s:%d' % (host, port)
+        with self._lock:
+            if key not in self._hosts:
+                session = self._session_factory(server_port=port, host=host,
+                                                rpc_timeout=self._rpc_timeout)
+                self._hosts[key] = Host(key, session)
+        return key
+
+    def unregister(self, key):
+        with self._lock:
+            del self._hosts[key]
+
+    @property
+    def hosts(self):
+        with self._lock:
+            return sorted(self._hosts)
+
+    @property
+    def inventory(self):
+        """
+        Mapping of host keys to mappings of target identifiers to lists of
+        device identifiers.
+        """
+        with self._lock:
+            return {key: dict(host.inventory) for key, host in self._hosts.items()}
+
+    @property
+    def errors(self):
+        """
+        Mapping of host keys to the error encountered during their last
+        refresh, for hosts that could not be refreshed.
+        """
+        with self._lock:
+            return {key: host.error for key, host in self._hosts.items()
+                    if host.error is not None}
+
+    def refresh(self):
+        """
+        Rediscover the targets and devices of all hosts. Hosts are queried
+        concurrently, so that a refresh takes about as long as the slowest
+        host. Hosts that fail to respond end up with an empty inventory and
+        their error recorded.
+        """
+        with self._lock:
+            hosts = list(self._hosts.values())
+
+        with concurrent.futures.ThreadPoolExecutor(self._max_workers) as executor:
+            target_futures = {host: executor.submit(self._call, host,
+                                                    host.session.get_target_identifiers,
+                                                    refresh=True)
+                              for host in hosts}
+            device_futures = {}
+            for host, future in target_futures.items():
+                try:
+                    targets = future.result()
+                except fpgaedu.jsonrpc2.RpcError as err:
+                    host.inventory, host.error = {}, err
+                    continue
+                device_futures[host] = {
+                    target: executor.submit(self._call, host,
+                                            host.session.get_device_identifiers,
+                                            target, refresh=True)
+                    for target in targets}
+
+            for host, futures in device_futures.items():
+                try:
+                    inventory = {target: future.result()
+                                 for target, future in futures.items()}
+                except fpgaedu.jsonrpc2.RpcError as err:
+                    host.inventory, host.error = {}, err
+                else:
+                    host.inventory, host.error = inventory, None
+
+    def start_refresh(self, interval=60):
+        """
+        Start a background thread refreshing the inventory every interval
+        seconds until stop_refresh() is called.
+        """
+        if self._refresh_thread is not None:
+            return
+        self._refresh_stop.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_periodically, args=(interval,), daemon=True,
+            name='coordinator refresh')
+        self._refresh_thread.start()
+
+    def stop_refresh(self):
+        """
+        Stop the refresh thread, if running.
+        """
+        thread = self._refresh_thread
+        if thread is None:
+            return
+        self._refresh_stop.set()
+        thread.join()
+        self._refresh_thread = None
+
+    def _refresh_periodically(self, interval):
+        while not self._refresh_stop.wait(interval):
+            self.refresh()
+
+    def locate(self, target):
+        """
+        Return the key of the host owning the provided target.
+        """
+        with self._lock:
+            owners = [key for key, host in self._hosts.items()
+                      if target in host.inventory]
+        if not owners:
+            raise UnknownBoardError('no host owns target %s' % target)
+        if len(owners) > 1:
+            raise FederationError('target %s is owned by hosts %s'
+                                  % (target, ', '.join(sorted(owners))))
+        return owners[0]
+
+    def get_target_identifiers(self):
+        """
+        Return the identifiers of the targets of all hosts.
+        """
+        with self._lock:
+            return sorted(target for host in self._hosts.values()
+                          for target in host.inventory)
+
+    def get_device_identifiers(self, target):
+        host = self._host(target)
+        return list(host.inventory[target])
+
+    def program(self, target, device, bitstream):
+        """
+        Program a board on the host owning its target.
+        """
+        host = self._host(target)
+        if device not in host.inventory[target]:
+            raise UnknownBoardError('target %s has no device %s' % (target, device))
+        self._call(host, host.session.program, target, device, bitstream)
+
+    def _host(self, target):
+        key = self.locate(target)
+        with self._lock:
+            return self._hosts[key]
+
+    @staticmethod
+    def _call(host, method, *args, **kwargs):
+        with host.lock:
+            return method(*args, **kwargs)
@@ -12,8 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import codecs
+import collections
+import itertools
 import json
 import socket
+import struct
+import threading
+import time
 
 import jsonschema
 
@@ -56,6 +62,19 @@ REQUEST_SCHEMA = {
                 },
                 "params": {
                     "type": ["array", "object"]
+                },
+                "timeout": {
+                    "type": "number",
+                    "minimum": 0,
+                    "note": [
+                        "Extension to JSON-RPC 2.0: the number of seconds "\
+                            "the client awaits the response. Servers may "\
+                            "drop requests that are still unprocessed once "\
+                            "this period has passed since their receipt. "\
+                            "The period is relative, so that it does not "\
+                            "depend on the clocks of client and server "\
+                            "being synchronized."
+                    ]
                 }
             }
         }
@@ -130,6 +149,22 @@ RESPONSE_SCHEMA = {
     }
 }
 
+# Schemas are checked for every call, so their validators are built once.
+REQUEST_VALIDATOR = jsonschema.Draft4Validator(REQUEST_SCHEMA)
+RESPONSE_VALIDATOR = jsonschema.Draft4Validator(RESPONSE_SCHEMA)
+
+# Binary side-channel framing. Bulk binary data is not embedded in the JSON
+# message (which would require base64 encoding), but sent next to it in a
+# frame: FRAME_MAGIC, the lengths of the JSON message and the binary payload
+# as 32-bit big-endian integers, the JSON message and finally the payload.
+# Plain JSON messages never start with a NUL byte, so that framed and
+# unframed messages can be told apart.
+FRAME_MAGIC = b'\x00FEB'
+FRAME_HEADER = struct.Struct('>4sII')
+# Responses larger than this are not read into memory, unless an endpoint is
+# configured otherwise.
+DEFAULT_MAX_RESPONSE_SIZE = 256 * 1024 * 1024
+
 class RpcError(Exception):
     pass
 
@@ -177,78 +212,393 @@ class InvalidResponseError(RpcError):
 class EndpointError(RpcError):
     pass
 
+class TimeoutError(RpcError):
+    """
+    Error class representing the case in which a call did not complete within
+    its timeout, either while connecting, sending the request or receiving the
+    response.
+    """
+    pass
+
+class ResponseTooLargeError(RpcError):
+    """
+    Error class representing the case in which a response exceeded the
+    endpoint's maximum response size. Reading stops as soon as the limit is
+    exceeded.
+    """
+    pass
+
+class OverloadedError(RpcError):
+    """
+    Error class representing the case in which a call was rejected without
+    being sent, because too many calls are in flight or queued, or because
+    the caller exceeded its rate limit. retry_after is the number of seconds
+    after which a retry is expected to be admitted.
+    """
+    def __init__(self, message, retry_after):
+        super().__init__(message, retry_after)
+        self.message = message
+        self.retry_after = retry_after
+
+def encode_frame(message, payload):
+    """
+    Return a frame containing the JSON message and the binary payload.
+    """
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(message), len(payload)) + \
+        message + payload
+
+def decode_frame(data):
+    """
+    Split received data into its JSON message and binary payload. Data that
+    is not framed is returned as message with an empty payload.
+    """
+    if not data.startswith(FRAME_MAGIC):
+        return data, b''
+    if len(data) < FRAME_HEADER.size:
+        raise ResponseParseError('truncated frame header')
+    _, message_length, payload_length = FRAME_HEADER.unpack_from(data)
+    if FRAME_HEADER.size + message_length + payload_length != len(data):
+        raise ResponseParseError('frame length mismatch')
+    data = memoryview(data)
+    message_end = FRAME_HEADER.size + message_length
+    return bytes(data[FRAME_HEADER.size:message_end]), data[message_end:]
+
 class Proxy:
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, timeout=None):
         self.endpoint = endpoint
-        self._id = 0
+        self.timeout = timeout
+        # next() on a count is atomic, so that ids stay unique when the
+        # proxy is shared between threads.
+        self._ids = itertools.count(1)
 
-    def call(self, method, params=None):
-
-        self._id += 1
+    def call(self, method, params=None, timeout=None):
+        """
+        Call a remote method and return its result. The timeout (in seconds)
+        bounds the complete call and defaults to the proxy's timeout. If a
+        timeout applies, it is sent along with the request so that the server
+        can drop the request once the timeout has expired.
+        """
+        result, _ = self.call_binary(method, params=params, timeout=timeout)
+        return result
 
+    def _make_request(self, method, params, timeout):
         request = {
             "jsonrpc": "2.0",
-            "id": self._id,
+            "id": next(self._ids),
             "method": method,
         }
 
         if params is not None:
             request["params"] = params
 
-        jsonschema.validate(request, REQUEST_SCHEMA)
+        if timeout is not None:
+            request["timeout"] = timeout
+
+        REQUEST_VALIDATOR.validate(request)
 
-        request_json = json.dumps(request).encode()
+        return json.dumps(request).encode()
+
+    def call_binary(self, method, params=None, payload=b'', timeout=None):
+        """
+        Call a remote method, sending the binary payload next to the request
+        in a frame. Returns a tuple of the result and the binary payload of
+        the response, the latter being empty if the response was not framed.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        request_json = self._make_request(method, params, timeout)
+        if payload:
+            request_json = encode_frame(request_json, payload)
         # Transmit request json and receive response through endpoint
-        response_json = self.endpoint.communicate(request_json)
+        response_data = self.endpoint.communicate(request_json, timeout=timeout)
+        response_json, response_payload = decode_frame(response_data)
         # Parse response
         try:
             response = json.loads(response_json.decode())
-        except json.JSONDecodeError as err:
+        except (json.JSONDecodeError, UnicodeDecodeError) as err:
             raise ResponseParseError from err
         # Validate response
         try:
-            jsonschema.validate(response, RESPONSE_SCHEMA)
+            RESPONSE_VALIDATOR.validate(response)
         except jsonschema.ValidationError:
             raise InvalidResponseError
 
         try:
-            return response['result']
+            return response['result'], response_payload
         except KeyError:
-            error_code = response['error'].get('code')
-            error_message = response['error'].get('message')
-            error_data = response['error'].get('data')
-
-            if error_code == CODE_PARSE_ERROR:
-                raise RequestParseError(error_message, data=error_data)
-            elif error_code == CODE_INVALID_REQUEST:
-                raise InvalidRequestError(error_message, data=error_data)
-            elif error_code == CODE_UNKNOWN_METHOD:
-                raise UnknownMethodError(error_message, data=error_data)
-            elif error_code == CODE_INVALID_PARAMS:
-                raise InvalidParamsError(error_message, data=error_data)
-            elif error_code == CODE_INTERNAL_ERROR:
-                raise InternalServerError(error_message, data=error_data)
-            else:
-                raise ServerError(error_code, error_message, error_data)
+            _raise_server_error(response['error'])
+
+    def call_iter(self, method, params=None, timeout=None):
+        """
+        Call a remote method returning an array and iterate over its items
+        while the response is being received, so that memory use is bounded
+        by the largest item instead of the complete response. The envelope is
+        checked once the complete response is received, i.e. after the last
+        item has been yielded.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        request_json = self._make_request(method, params, timeout)
+        chunks = self.endpoint.communicate_iter(request_json, timeout=timeout)
+        decoder = _StreamDecoder(chunks)
+        members = {}
+        result_seen = False
+
+        decoder.expect('{')
+        if decoder.peek() != '}':
+            while True:
+                key = decoder.value()
+                if not isinstance(key, str):
+                    raise ResponseParseError('object key must be a string')
+                decoder.expect(':')
+                if key == 'result' and decoder.peek() == '[':
+                    result_seen = True
+                    decoder.expect('[')
+                    if decoder.peek() == ']':
+                        decoder.expect(']')
+                    else:
+                        while True:
+                            yield decoder.value()
+                            if decoder.peek() == ',':
+                                decoder.expect(',')
+                            else:
+                                decoder.expect(']')
+                                break
+                else:
+                    members[key] = decoder.value()
+                if decoder.peek() == ',':
+                    decoder.expect(',')
+                else:
+                    break
+        decoder.expect('}')
+
+        if members.get('jsonrpc') != '2.0' or 'id' not in members:
+            raise InvalidResponseError
+        if 'error' in members:
+            if result_seen or not isinstance(members['error'], dict):
+                raise InvalidResponseError
+            _raise_server_error(members['error'])
+        if not result_seen:
+            # Either no result at all or a result that is not an array
+            raise InvalidResponseError
+
+def _raise_server_error(error):
+    error_code = error.get('code')
+    error_message = error.get('message')
+    error_data = error.get('data')
+
+    if error_code == CODE_PARSE_ERROR:
+        raise RequestParseError(error_message, data=error_data)
+    elif error_code == CODE_INVALID_REQUEST:
+        raise InvalidRequestError(error_message, data=error_data)
+    elif error_code == CODE_UNKNOWN_METHOD:
+        raise UnknownMethodError(error_message, data=error_data)
+    elif error_code == CODE_INVALID_PARAMS:
+        raise InvalidParamsError(error_message, data=error_data)
+    elif error_code == CODE_INTERNAL_ERROR:
+        raise InternalServerError(error_message, data=error_data)
+    else:
+        raise ServerError(error_code, error_message, error_data)
+
+# Characters that may follow a complete JSON value
+_VALUE_DELIMITERS = frozenset(' \t\r\n,:]}')
+
+class _StreamDecoder:
+    """
+    Incremental JSON decoder reading from an iterator of byte chunks. Only
+    the unconsumed part of the received data is kept in memory.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_length=1):
+        """
+        Append at least min_length characters (unless the end of the response
+        is reached) to the buffer, dropping its consumed part. Returns False
+        if the end of the response had already been reached.
+        """
+        if self._eof:
+            return False
+        texts = [self._buffer[self._pos:]]
+        length = 0
+        while length < min_length and not self._eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                chunk = b''
+            try:
+                text = self._text_decoder.decode(chunk, final=self._eof)
+            except UnicodeDecodeError as err:
+                raise ResponseParseError from err
+            texts.append(text)
+            length += len(text)
+        self._buffer = ''.join(texts)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Return the next non-whitespace character without consuming it.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ResponseParseError('unexpected end of response')
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ResponseParseError('expected %r' % char)
+        self._pos += 1
+
+    def value(self):
+        """
+        Decode and consume the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as err:
+                # Double the buffered data before retrying, so that decoding
+                # a large value does not take quadratic time
+                if not self._fill(min_length=max(1, len(self._buffer) - self._pos)):
+                    raise ResponseParseError from err
+                continue
+            # A value not followed by a delimiter might continue in the next
+            # chunk, e.g. a number split as '1.' and '5' decodes as 1
+            if (end == len(self._buffer) or
+                    self._buffer[end] not in _VALUE_DELIMITERS) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+class RecentResults:
+    """
+    Table of the results of recent requests by idempotency key, for use by
+    server implementations. A request carrying a key that was seen before is
+    not executed again, but answered with the stored result, or, if the first
+    request is still being executed, with its result once available. Results
+    expire ttl seconds after completion and at most max_entries results are
+    kept. Failed requests are not stored, so that a retry executes again.
+    """
+    def __init__(self, ttl=300, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _purge(self, max_entries):
+        # Drop expired results and, oldest first, results beyond max_entries
+        now = time.monotonic()
+        for key, entry in list(self._entries.items()):
+            if entry['expires'] is not None and \
+                    (entry['expires'] <= now or len(self._entries) > max_entries):
+                del self._entries[key]
+
+    def execute(self, key, function, *args, **kwargs):
+        """
+        Return the result of function(*args, **kwargs), executing it only if
+        no result is known for the key.
+        """
+        with self._lock:
+            self._purge(self.max_entries)
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                # Make room for the new entry
+                self._purge(self.max_entries - 1)
+                entry = {'done': threading.Event(), 'result': None,
+                         'error': None, 'expires': None}
+                self._entries[key] = entry
+
+        if not owner:
+            entry['done'].wait()
+            if entry['error'] is not None:
+                raise entry['error']
+            return entry['result']
+
+        try:
+            entry['result'] = function(*args, **kwargs)
+        except Exception as err:
+            entry['error'] = err
+            with self._lock:
+                del self._entries[key]
+            raise
+        finally:
+            entry['done'].set()
+        with self._lock:
+            entry['expires'] = time.monotonic() + self.ttl
+        return entry['result']
 
 class TcpSocketEndpoint:
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, max_response_size=DEFAULT_MAX_RESPONSE_SIZE):
         self.host = host
         self.port = port
+        self.max_response_size = max_response_size
+
+    def communicate(self, data, timeout=None):
+        """
+        Send data and return the complete response. If a timeout (in seconds)
+        is given, it bounds the connect, send and receive phases together and
+        TimeoutError is raised once it has passed.
+        """
+        packets = list(self.communicate_iter(data, timeout=timeout))
+        if not packets:
+            # The request may or may not have been processed by the server
+            raise EndpointError('connection closed without a response')
+        return b''.join(packets)
+
+    def communicate_iter(self, data, timeout=None):
+        """
+        Send data and iterate over the chunks of the response as they are
+        received. ResponseTooLargeError is raised once the response exceeds
+        max_response_size bytes, if set.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                raise TimeoutError
+            return remaining_time
 
-    def communicate(self, data):
         try:
-            with socket.create_connection((self.host, self.port)) as sock:
+            with socket.create_connection((self.host, self.port),
+                                          timeout=remaining()) as sock:
+                sock.settimeout(remaining())
                 sock.sendall(data)
                 sock.shutdown(socket.SHUT_WR)
-                recv_data = b''
+                received = 0
                 while True:
-                    packet = sock.recv(1024)
+                    sock.settimeout(remaining())
+                    packet = sock.recv(65536)
                     if not packet:
                         break
-                    recv_data += packet
-                return recv_data
+                    received += len(packet)
+                    if self.max_response_size is not None and \
+                            received > self.max_response_size:
+                        raise ResponseTooLargeError(
+                            'response exceeds %d bytes' % self.max_response_size)
+                    yield packet
+        except socket.timeout as err:
+            raise TimeoutError from err
         except OSError as err:
             raise EndpointError from err
-
@@ -0,0 +1,417 @@
+import collections
+import concurrent.futures
+import contextlib
+import threading
+import time
+
+import fpgaedu.events
+import fpgaedu.jsonrpc2
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+
+# Methods that transfer bulk data or keep the hardware busy for a long time
+BULK_METHODS = frozenset(['program', 'readMemory', 'writeMemory',
+                          'readRegisters', 'writeRegisters'])
+
+_local = threading.local()
+
+@contextlib.contextmanager
+def as_caller(name):
+    """
+    Context manager attributing the calls made by the current thread within
+    its block to the named caller, for both Scheduler and AdmissionController.
+    """
+    previous = getattr(_local, 'caller', None)
+    _local.caller = name
+    try:
+        yield
+    finally:
+        _local.caller = previous
+
+def current_caller():
+    """
+    Return the caller set for the current thread using as_caller(), or else the
+    name of the current thread.
+    """
+    return getattr(_local, 'caller', None) or threading.current_thread().name
+
+class _Request:
+    def __init__(self, kind, method, kwargs, timeout, priority, caller):
+        self.kind = kind
+        self.method = method
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.priority = priority
+        self.caller = caller
+        self.enqueued = time.monotonic()
+        self.future = concurrent.futures.Future()
+
+class _Queue:
+    """
+    Queue of requests of a single priority class. Every caller has its own
+    queue and callers are served round robin, so that a caller submitting
+    many requests cannot starve the others.
+    """
+    def __init__(self):
+        self.callers = collections.OrderedDict()
+        self.depth = 0
+        self.max_depth = 0
+        self.running = 0
+        self.completed = 0
+        self.waits = collections.deque(maxlen=1000)
+
+    def put(self, request):
+        self.callers.setdefault(request.caller, collections.deque()).append(request)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def get(self):
+        caller, requests = next(iter(self.callers.items()))
+        request = requests.popleft()
+        if requests:
+            # Serve the other callers before this one's next request
+            self.callers.move_to_end(caller)
+        else:
+            del self.callers[caller]
+        self.depth -= 1
+        return request
+
+class Scheduler:
+    """
+    Client-side scheduler in front of a Proxy, providing the same call
+    interface. Calls are classified as interactive or bulk by method name and
+    executed by a fixed number of workers. Bulk calls never occupy more than
+    bulk_workers workers, which is less than the number of workers, keeping
+    at least one worker free for interactive calls, which are always served
+    first. Within a class, callers are served round robin.
+
+    The caller of a call is either passed explicitly, set for a block using
+    caller(), or else the name of the calling thread.
+    """
+    def __init__(self, proxy, workers=4, bulk_workers=None,
+                 bulk_methods=BULK_METHODS):
+        if workers < 2:
+            raise ValueError('a scheduler needs at least 2 workers, got %d'
+                             % workers)
+        if bulk_workers is None:
+            bulk_workers = workers - 1
+        elif not 1 <= bulk_workers < workers:
+            raise ValueError('bulk_workers must be between 1 and %d, got %d'
+                             % (workers - 1, bulk_workers))
+        self.proxy = proxy
+        self.workers = workers
+        self.bulk_workers = bulk_workers
+        self.bulk_methods = bulk_methods
+        self._queues = {priority: _Queue() for priority in PRIORITIES}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def caller(self, name):
+        """
+        Context manager attributing the calls made by the current thread
+        within its block to the named caller. Equivalent to as_caller().
+        """
+        return as_caller(name)
+
+    def call(self, method, params=None, timeout=None, priority=None,
+             caller=None):
+        return self._submit('call', method, {'params': params}, timeout,
+                            priority, caller)
+
+    def call_binary(self, method, params=None, payload=b'', timeout=None,
+                    priority=None, caller=None):
+        return self._submit('call_binary', method,
+                            {'params': params, 'payload': payload}, timeout,
+                            priority, caller)
+
+    def call_iter(self, method, params=None, timeout=None, priority=None,
+                  caller=None):
+        """
+        Call a remote method returning an array through Proxy.call_iter(). The
+        items are collected by the worker and returned as a complete list, so
+        that memory use is bounded by the endpoint's max_response_size rather
+        than by the largest item.
+        """
+        return self._submit('call_iter', method, {'params': params}, timeout,
+                            priority, caller)
+
+    def _submit(self, kind, method, kwargs, timeout, priority, caller):
+        if priority is None:
+            priority = PRIORITY_BULK if method in self.bulk_methods \
+                else PRIORITY_INTERACTIVE
+        if caller is None:
+            caller = current_caller()
+        if timeout is None:
+            timeout = getattr(self.proxy, 'timeout', None)
+
+        request = _Request(kind, method, kwargs, timeout, priority, caller)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('scheduler is closed')
+            self._queues[priority].put(request)
+            self._start_workers()
+            self._condition.notify()
+        return request.future.result()
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, daemon=True,
+                                      name='scheduler-%d' % len(self._threads))
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        interactive = self._queues[PRIORITY_INTERACTIVE]
+        bulk = self._queues[PRIORITY_BULK]
+        if interactive.depth:
+            return interactive
+        if bulk.depth and bulk.running < self.bulk_workers:
+            return bulk
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                queue = self._next()
+                while queue is None and not self._closed:
+                    self._condition.wait()
+                    queue = self._next()
+                if queue is None:
+                    return
+                request = queue.get()
+                queue.running += 1
+                wait = time.monotonic() - request.enqueued
+                queue.waits.append(wait)
+
+            result = error = None
+            try:
+                if request.timeout is not None and wait >= request.timeout:
+                    raise fpgaedu.jsonrpc2.TimeoutError
+                if request.timeout is not None:
+                    request.kwargs['timeout'] = request.timeout - wait
+                method = getattr(self.proxy, request.kind)
+                result = method(request.method, **request.kwargs)
+                if request.kind == 'call_iter':
+                    result = list(result)
+            except BaseException as err:
+                error = err
+            # Count the call as completed before its caller can observe it
+            with self._condition:
+                queue.running -= 1
+                queue.completed += 1
+                self._condition.notify()
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+    def metrics(self):
+        """
+        Return per priority class the current queue depth, the maximum queue
+        depth, the number of running and completed calls and percentiles of
+        the time (in seconds) recent calls waited in the queue.
+        """
+        with self._condition:
+            return {priority: {
+                'depth': queue.depth,
+                'max_depth': queue.max_depth,
+                'running': queue.running,
+                'completed': queue.completed,
+                'wait': fpgaedu.events.percentiles(queue.waits)
+            } for priority, queue in self._queues.items()}
+
+    def close(self):
+        """
+        Stop the workers once the queued calls have been executed. Calls made
+        after close() has returned start new workers.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        with self._condition:
+            self._closed = False
+
+# Method groups subject to admission control
+GROUP_PROGRAM = 'program'
+GROUP_DISCOVERY = 'discovery'
+ADMISSION_GROUPS = {
+    GROUP_PROGRAM: frozenset(['program']),
+    GROUP_DISCOVERY: frozenset(['getTargetIdentifiers', 'getDeviceIdentifiers'])
+}
+# Default (maximum in flight, maximum queued) per group
+ADMISSION_LIMITS = {
+    GROUP_PROGRAM: (1, 8),
+    GROUP_DISCOVERY: (4, 32)
+}
+
+class TokenBucket:
+    """
+    Token bucket holding at most burst tokens, refilled at rate tokens per
+    second.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def take(self):
+        """
+        Take a token, returning 0 if a token was available or else the number
+        of seconds until one will be.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+class _Group:
+    def __init__(self, max_in_flight, max_queued):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Exponentially weighted moving average of call durations, used to
+        # estimate when a rejected call may be retried.
+        self.service_time = None
+
+    def retry_after(self):
+        service_time = self.service_time or 1.0
+        return service_time * (self.queued + 1) / max(1, self.max_in_flight)
+
+class AdmissionController:
+    """
+    Admission control in front of a Proxy (or Scheduler), providing the same
+    call interface. Calls of every method group are limited to max_in_flight
+    concurrent calls, with at most max_queued further calls waiting for a
+    slot. Calls beyond that are rejected immediately with an OverloadedError
+    instead of piling up. If a rate limit (tokens per second, burst) is set,
+    every caller is additionally limited by a token bucket. Methods outside
+    the groups are passed through unchecked.
+
+    As with Scheduler, the caller is either passed explicitly, set for a
+    block using as_caller(), or else the name of the calling thread. Calls
+    passed on to a wrapped Scheduler keep their caller.
+    """
+    def __init__(self, proxy, limits=None, rate_limit=None,
+                 groups=ADMISSION_GROUPS):
+        limits = dict(ADMISSION_LIMITS, **(limits or {}))
+        self.proxy = proxy
+        self.rate_limit = rate_limit
+        self._groups = {name: _Group(*limits[name]) for name in groups}
+        self._method_groups = {method: name for name, methods in groups.items()
+                               for method in methods}
+        self._buckets = {}
+        self._condition = threading.Condition()
+
+    def call(self, method, params=None, timeout=None, caller=None):
+        return self._admit('call', method, {'params': params}, timeout, caller)
+
+    def call_binary(self, method, params=None, payload=b'', timeout=None,
+                    caller=None):
+        return self._admit('call_binary', method,
+                           {'params': params, 'payload': payload}, timeout,
+                           caller)
+
+    def call_iter(self, method, params=None, timeout=None, caller=None):
+        """
+        Call a remote method returning an array through the call_iter() of the
+        wrapped proxy. The items are collected while the call holds its slot
+        and returned as a complete list, so that memory use is bounded by the
+        endpoint's max_response_size rather than by the largest item.
+        """
+        return self._admit('call_iter', method, {'params': params}, timeout,
+                           caller)
+
+    def _admit(self, kind, method, kwargs, timeout, caller):
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if caller is None:
+            caller = current_caller()
+        proxy_call = getattr(self.proxy, kind)
+
+        def call(method, **kwargs):
+            # A wrapped Scheduler attributes the call to the same caller
+            with as_caller(caller):
+                result = proxy_call(method, **kwargs)
+                if kind == 'call_iter':
+                    result = list(result)
+                return result
+
+        group_name = self._method_groups.get(method)
+        if group_name is None:
+            return call(method, **kwargs)
+
+        group = self._groups[group_name]
+        start = time.monotonic()
+
+        with self._condition:
+            if self.rate_limit is not None:
+                bucket = self._buckets.get(caller)
+                if bucket is None:
+                    bucket = self._buckets[caller] = TokenBucket(*self.rate_limit)
+                retry_after = bucket.take()
+                if retry_after:
+                    group.rejected += 1
+                    raise fpgaedu.jsonrpc2.OverloadedError(
+                        'rate limit of %s exceeded' % caller, retry_after)
+
+            if group.in_flight >= group.max_in_flight:
+                if group.queued >= group.max_queued:
+                    group.rejected += 1
+                    raise fpgaedu.jsonrpc2.OverloadedError(
+                        '%s calls saturated' % group_name, group.retry_after())
+                group.queued += 1
+                try:
+                    while group.in_flight >= group.max_in_flight:
+                        remaining = None if timeout is None \
+                            else start + timeout - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise fpgaedu.jsonrpc2.TimeoutError
+                        self._condition.wait(remaining)
+                finally:
+                    group.queued -= 1
+            group.in_flight += 1
+            group.admitted += 1
+
+        if timeout is not None:
+            kwargs['timeout'] = max(0, start + timeout - time.monotonic())
+        call_start = time.monotonic()
+        try:
+            return call(method, **kwargs)
+        finally:
+            duration = time.monotonic() - call_start
+            with self._condition:
+                group.in_flight -= 1
+                if group.service_time is None:
+                    group.service_time = duration
+                else:
+                    group.service_time = 0.8 * group.service_time + 0.2 * duration
+                # Waiters of all groups share the condition
+                self._condition.notify_all()
+
+    def metrics(self):
+        """
+        Return per method group the number of calls in flight and queued, and
+        the number of admitted and rejected calls.
+        """
+        with self._condition:
+            return {name: {
+                'in_flight': group.in_flight,
+                'queued': group.queued,
+                'admitted': group.admitted,
+                'rejected': group.rejected
+            } for name, group in self._groups.items()}
@@ -0,0 +1,121 @@
+import concurrent.futures
+import shlex
+import sys
+import time
+
+from fpgaedu.shell import registry
+
+class ScriptError(Exception):
+    """
+    Error class representing an invalid line in a command script.
+    """
+    def __init__(self, lineno, message):
+        super().__init__('line %d: %s' % (lineno, message))
+        self.lineno = lineno
+        self.message = message
+
+class ScriptCommand:
+    """
+    A single parsed command of a script, along with its execution results.
+    """
+    def __init__(self, lineno, line, argv, command, options):
+        self.lineno = lineno
+        self.line = line
+        self.argv = argv
+        self.command = command
+        self.options = options
+        self.resources = getattr(command, 'resources', lambda _: None)(options)
+        self.duration = None
+        self.error = None
+
+    def conflicts(self, resources):
+        """
+        Return whether this command must not run concurrently with commands
+        using the provided resources. Commands that do not declare their
+        resources conflict with every other command.
+        """
+        if self.resources is None or resources is None:
+            return True
+        return not self.resources.isdisjoint(resources)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.command.run(self.options)
+        except SystemExit:
+            self.error = 'exited'
+        except Exception as err:
+            self.error = repr(err)
+        finally:
+            self.duration = time.perf_counter() - start
+
+def parse_script(text, commands):
+    """
+    Parse all lines of a script up front, so that mistakes are reported
+    before any command is executed. Blank lines and comments are skipped.
+    """
+    script = []
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as err:
+            raise ScriptError(lineno, str(err))
+        if not argv:
+            continue
+        if argv[0] not in commands:
+            raise ScriptError(lineno, 'unknown command %s' % argv[0])
+        try:
+            command = commands[argv[0]]
+        except registry.CommandLoadError as err:
+            raise ScriptError(lineno, str(err))
+        try:
+            options = command.parse_args(argv)
+        except SystemExit:
+            raise ScriptError(lineno, 'invalid arguments for %s' % argv[0])
+        script.append(ScriptCommand(lineno, line.strip(), argv, command, options))
+    return script
+
+def run_script(script, jobs=1):
+    """
+    Execute the commands of a parsed script using at most the given number of
+    concurrent jobs. A command is started once no earlier, unfinished command
+    uses any of its resources, so that the order of commands on the same
+    resource is preserved.
+    """
+    jobs = max(1, jobs)
+    pending = list(script)
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            busy = [cmd.resources for cmd in running.values()]
+            ready = []
+            for cmd in pending:
+                if len(running) + len(ready) >= jobs:
+                    break
+                if not any(cmd.conflicts(resources) for resources in busy):
+                    ready.append(cmd)
+                busy.append(cmd.resources)
+            for cmd in ready:
+                pending.remove(cmd)
+                running[executor.submit(cmd.run)] = cmd
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+
+    return script
+
+def print_summary(script, duration, file=sys.stdout):
+    """
+    Print the execution time and status of every command of a script.
+    """
+    print('%-6s %10s  %-8s %s' % ('line', 'time (s)', 'status', 'command'),
+          file=file)
+    for cmd in script:
+        print('%-6d %10.3f  %-8s %s' % (cmd.lineno, cmd.duration or 0,
+                                        'FAILED' if cmd.error else 'ok',
+                                        cmd.line), file=file)
+        if cmd.error:
+            print('       %s' % cmd.error, file=file)
+    print('%d commands in %.3f s' % (len(script), duration), file=file)
@@ -1 +1,17 @@
-from .program import ProgramCommand
+import importlib
+
+# Command classes are imported on first access, so that importing this
+# package does not import every command.
+_COMMAND_MODULES = {
+    'DevicesCommand': '.devices',
+    'ProgramCommand': '.program',
+    'TargetsCommand': '.targets'
+}
+
+__all__ = list(_COMMAND_MODULES)
+
+def __getattr__(name):
+    if name in _COMMAND_MODULES:
+        module = importlib.import_module(_COMMAND_MODULES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
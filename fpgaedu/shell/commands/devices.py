@@ -0,0 +1,38 @@
+import argparse
+import functools
+
+
+class DevicesCommand:
+
+    name = 'devices'
+    description = 'list the devices of a target'
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def create_parser():
+        parser = argparse.ArgumentParser(DevicesCommand.name,
+                                         description=DevicesCommand.description)
+        parser.add_argument('target',
+                            help='the target identifier',
+                            metavar='TARGET')
+        parser.add_argument('--refresh', action='store_true',
+                            help='bypass the cached device list')
+        return parser
+
+    def __init__(self, sessions=None):
+        self.sessions = sessions
+
+    def parse_args(self, argv):
+        return DevicesCommand.create_parser().parse_args(argv[1:])
+
+    def resources(self, options):
+        return frozenset()
+
+    def run(self, options):
+        with self.sessions.session() as session:
+            devices = session.get_device_identifiers(options.target,
+                                                     refresh=options.refresh)
+        print('\n'.join(devices))
+
+    def execute(self, argv):
+        self.run(self.parse_args(argv))
@@ -1,4 +1,7 @@
 import argparse
+import functools
+
+import fpgaedu.bitstream
 
 
 class ProgramCommand:
@@ -6,25 +9,49 @@ class ProgramCommand:
     name = 'program'
     description = 'program a board'
 
-    parser = argparse.ArgumentParser(name, description=description)
-    parser.add_argument('bitstream',
-                        help='the bitstream used for programming',
-                        metavar='BITSTREAM')
-    parser.add_argument('target',
-                        help='the target identifier',
-                        metavar="TARGET")
-    parser.add_argument('device',
-                        help='the device identifier',
-                        metavar='DEVICE')
-
-    def __init__(self):
-        self.programmer = None
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def create_parser():
+        # Built on first use rather than on import, keeping shell startup
+        # independent of the number of commands.
+        parser = argparse.ArgumentParser(ProgramCommand.name,
+                                         description=ProgramCommand.description)
+        parser.add_argument('bitstream',
+                            help='the bitstream used for programming',
+                            metavar='BITSTREAM')
+        parser.add_argument('target',
+                            help='the target identifier',
+                            metavar="TARGET")
+        parser.add_argument('device',
+                            help='the device identifier',
+                            metavar='DEVICE')
+        return parser
+
+    def __init__(self, sessions=None):
+        self.sessions = sessions
+
+    def parse_args(self, argv):
+        return ProgramCommand.create_parser().parse_args(argv[1:])
+
+    def resources(self, options):
+        # A target is a single JTAG cable, which cannot program two of its
+        # devices at once. Programs on different targets may run concurrently.
+        return frozenset([options.target])
+
+    def run(self, options):
+        # Validate the bitstream before waiting for a session, so that bad
+        # files are rejected without starting Vivado.
+        bitstream = fpgaedu.bitstream.load(options.bitstream)
+        bitstream.check_device(options.device)
+
+        print('Programming\n'
+              '   bitstream = %s\n'
+              '   target    = %s\n'
+              '   device    = %s' % (options.bitstream, options.target,
+                                     options.device))
+
+        with self.sessions.session() as session:
+            session.program(options.target, options.device, bitstream)
 
     def execute(self, argv):
-
-        options = ProgramCommand.parser.parse_args(argv[1:])
-
-        print('Programming')
-        print('   bitstream = %s' % options.bitstream)
-        print('   target    = %s' % options.target)
-        print('   device    = %s' % options.device)
+        self.run(self.parse_args(argv))
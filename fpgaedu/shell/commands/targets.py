@@ -0,0 +1,34 @@
+import argparse
+import functools
+
+
+class TargetsCommand:
+
+    name = 'targets'
+    description = 'list the targets connected to the hardware server'
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def create_parser():
+        parser = argparse.ArgumentParser(TargetsCommand.name,
+                                         description=TargetsCommand.description)
+        parser.add_argument('--refresh', action='store_true',
+                            help='bypass the cached target list')
+        return parser
+
+    def __init__(self, sessions=None):
+        self.sessions = sessions
+
+    def parse_args(self, argv):
+        return TargetsCommand.create_parser().parse_args(argv[1:])
+
+    def resources(self, options):
+        return frozenset()
+
+    def run(self, options):
+        with self.sessions.session() as session:
+            targets = session.get_target_identifiers(refresh=options.refresh)
+        print('\n'.join(targets))
+
+    def execute(self, argv):
+        self.run(self.parse_args(argv))
@@ -1,14 +1,63 @@
 import cmd
+import shlex
+import sys
+import time
+
+import fpgaedu.bitstream
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+from fpgaedu.shell import batch
+from fpgaedu.shell import registry
 
 class ExperimentationShell(cmd.Cmd):
     '''
     Custom shell implementation based on cmd.Cmd that allows for dynamic
-    loading of commands.
+    loading of commands. Unless a command registry is provided, the builtin
+    commands and those of installed plugins are available, each imported only
+    once it is first used.
     '''
 
-    def __init__(self):
+    def __init__(self, sessions=None, commands=None):
         super().__init__()
-        self.commands = {}
+        if commands is None:
+            commands = registry.CommandRegistry.default(sessions=sessions)
+        self.commands = commands
+        self.sessions = sessions
+
+    def add_command(self, command):
+        '''
+        Register a command, providing it with the shell's session pool.
+        '''
+        command.sessions = self.sessions
+        self.commands.add(command)
+
+    def completenames(self, text, *ignored):
+        '''
+        Complete command names from the registry, without importing the
+        commands themselves.
+        '''
+        names = set(super().completenames(text, *ignored))
+        names.update(name for name in self.commands if name.startswith(text))
+        return sorted(names)
+
+    def do_help(self, arg):
+        '''
+        Handler for help shell command.
+        '''
+        if arg in self.commands:
+            try:
+                self.commands[arg].execute([arg, '--help'])
+            except SystemExit:
+                pass
+            except registry.CommandLoadError as err:
+                print('*** %s' % err)
+            return
+        super().do_help(arg)
+        if not arg and len(self.commands) > 0:
+            print('Experimentation commands:')
+            for name in self.commands:
+                print('%-12s %s' % (name, self.commands.description(name)))
+            print()
 
     def do_exit(self, _):
         '''
@@ -17,7 +66,11 @@ class ExperimentationShell(cmd.Cmd):
         return True
 
     def default(self, line):
-        argv = line.split()
+        try:
+            argv = shlex.split(line)
+        except ValueError as err:
+            print('*** %s' % err)
+            return
 
         if len(argv) <= 0:
             super().default(line)
@@ -28,5 +81,29 @@ class ExperimentationShell(cmd.Cmd):
                 self.commands[argv[0]].execute(argv)
             except SystemExit:
                 pass
+            except (fpgaedu.bitstream.BitstreamError,
+                    fpgaedu.jsonrpc2.RpcError,
+                    fpgaedu.vivado.SessionError,
+                    fpgaedu.vivado.SessionTimeoutError,
+                    registry.CommandLoadError) as err:
+                print('*** %s: %s' % (type(err).__name__, err))
         else:
             super().default(line)
+
+    def run_script(self, text, jobs=1, file=sys.stdout):
+        '''
+        Execute a complete command script in batch mode. The script is parsed
+        up front, after which commands on distinct resources are executed
+        concurrently by at most the given number of jobs. Returns True if all
+        commands succeeded.
+        '''
+        try:
+            script = batch.parse_script(text, self.commands)
+        except batch.ScriptError as err:
+            print('*** %s' % err, file=file)
+            return False
+
+        start = time.perf_counter()
+        batch.run_script(script, jobs=jobs)
+        batch.print_summary(script, time.perf_counter() - start, file=file)
+        return all(command.error is None for command in script)
@@ -0,0 +1,131 @@
+import collections.abc
+import importlib
+import importlib.metadata
+import threading
+
+# Entry point group through which installed packages provide shell commands.
+# Every entry point's name is the command name and its value refers to the
+# command class, e.g. 'scope = fpgaedu_scope.commands:ScopeCommand'.
+ENTRY_POINT_GROUP = 'fpgaedu.shell.commands'
+
+# Commands shipped with fpgaedu, mapping every command name to the command
+# class and its description. Listing the description here allows the shell to
+# complete and describe commands without importing them.
+BUILTIN_COMMANDS = {
+    'program': ('fpgaedu.shell.commands.program:ProgramCommand',
+                'program a board'),
+    'targets': ('fpgaedu.shell.commands.targets:TargetsCommand',
+                'list the targets connected to the hardware server'),
+    'devices': ('fpgaedu.shell.commands.devices:DevicesCommand',
+                'list the devices of a target')
+}
+
+class CommandLoadError(Exception):
+    """
+    Error class representing a registered command that could not be imported
+    or instantiated.
+    """
+    def __init__(self, name, target):
+        super().__init__('cannot load command %s from %s' % (name, target))
+        self.name = name
+        self.target = target
+
+class _Entry:
+    def __init__(self, name, target, description):
+        self.name = name
+        self.target = target
+        self.description = description
+        self.command = None
+
+class CommandRegistry(collections.abc.Mapping):
+    """
+    Mapping of command names to shell commands. Commands are registered by
+    reference, as 'module:Class', and are only imported and instantiated with
+    the registry's session pool once first looked up. The names and
+    descriptions of registered commands are available without importing them.
+    """
+    def __init__(self, sessions=None):
+        self.sessions = sessions
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls, sessions=None, group=ENTRY_POINT_GROUP):
+        """
+        Return a registry of the builtin commands and the commands provided
+        through entry points of the given group.
+        """
+        registry = cls(sessions=sessions)
+        for name, (target, description) in BUILTIN_COMMANDS.items():
+            registry.register(name, target, description)
+        registry.load_entry_points(group)
+        return registry
+
+    def register(self, name, target, description=None):
+        """
+        Register the command class referred to by target under the given
+        name, replacing any command registered earlier under that name.
+        """
+        with self._lock:
+            self._entries[name] = _Entry(name, target, description)
+
+    def add(self, command):
+        """
+        Register an already instantiated command under its name.
+        """
+        entry = _Entry(command.name, None, command.description)
+        entry.command = command
+        with self._lock:
+            self._entries[command.name] = entry
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        """
+        Register the commands provided through entry points of the given
+        group. Entry points do not replace commands of the same name that are
+        already registered.
+        """
+        for entry_point in importlib.metadata.entry_points(group=group):
+            if entry_point.name not in self._entries:
+                self.register(entry_point.name, entry_point.value)
+
+    def description(self, name):
+        """
+        Return the description of the named command. Commands are never
+        imported to obtain it, so that the description of a command registered
+        without one is empty until the command is first used.
+        """
+        entry = self._entries[name]
+        if entry.description is None and entry.command is not None:
+            entry.description = getattr(entry.command, 'description', '')
+        return entry.description or ''
+
+    def is_loaded(self, name):
+        """
+        Return whether the named command has been imported and instantiated.
+        """
+        return self._entries[name].command is not None
+
+    def __getitem__(self, name):
+        entry = self._entries[name]
+        with self._lock:
+            if entry.command is None:
+                entry.command = self._load(entry)
+            return entry.command
+
+    def _load(self, entry):
+        module_name, _, class_name = entry.target.partition(':')
+        try:
+            module = importlib.import_module(module_name)
+            command_class = getattr(module, class_name)
+            return command_class(sessions=self.sessions)
+        except Exception as err:
+            raise CommandLoadError(entry.name, entry.target) from err
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(sorted(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
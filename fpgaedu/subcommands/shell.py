@@ -1,8 +1,10 @@
-
 import argparse
+import functools
+import sys
 
+import fpgaedu.events
+import fpgaedu.vivado
 from fpgaedu.shell import ExperimentationShell
-from fpgaedu.shell.commands import ProgramCommand
 
 class ShellSubcommand:
 
@@ -13,12 +15,71 @@ class ShellSubcommand:
         pass
 
     @staticmethod
-    def execute(_):
-        shell = ExperimentationShell()
-
-        shell.commands[ProgramCommand.name] = ProgramCommand()
+    def add_arguments(parser):
+        parser.add_argument('--script',
+                            help='execute the commands in FILE (- for stdin) '
+                                 'in batch mode instead of interactively',
+                            metavar='FILE')
+        parser.add_argument('--jobs', type=int, default=4,
+                            help='the maximum number of commands executed '
+                                 'concurrently in batch mode; commands '
+                                 'sharing a Vivado session are scheduled '
+                                 'concurrently by the session',
+                            metavar='N')
+        parser.add_argument('--sessions', type=int, default=1,
+                            help='the number of Vivado sessions used in batch '
+                                 'mode, each on its own server port; more '
+                                 'than one requires a server application '
+                                 'that honours the -port Tcl argument',
+                            metavar='N')
+        parser.add_argument('--keepalive', type=float, default=60,
+                            help='check the health of idle Vivado sessions '
+                                 'every SECONDS, reconnecting to the hardware '
+                                 'server when needed (0 disables)',
+                            metavar='SECONDS')
 
-        shell.cmdloop()
+    @staticmethod
+    def execute(options):
+        script = getattr(options, 'script', None)
+        # Interactive use needs a single session, which is started by the
+        # first command that uses it and reused by all later commands. Batch
+        # jobs share the requested number of sessions. With more jobs than
+        # sessions, jobs use a session concurrently, its scheduler keeping a
+        # worker for every job and one more for interactive calls.
+        jobs = getattr(options, 'jobs', 1)
+        pool_size = 1 if script is None \
+            else max(1, getattr(options, 'sessions', 1))
+        shared = script is not None and jobs > pool_size
+        session_factory = fpgaedu.vivado.Session
+        if shared:
+            session_factory = functools.partial(fpgaedu.vivado.Session,
+                                                scheduler_workers=jobs + 1)
+        keepalive = getattr(options, 'keepalive', None) or None
+        sessions = fpgaedu.vivado.SessionPool(size=pool_size,
+                                              session_factory=session_factory,
+                                              keepalive_interval=keepalive,
+                                              shared=shared)
 
+        # The builtin and plugin commands are imported once first used
+        shell = ExperimentationShell(sessions=sessions)
 
-    
\ No newline at end of file
+        try:
+            if script is None:
+                shell.cmdloop()
+            elif script == '-':
+                if not shell.run_script(sys.stdin.read(), jobs=options.jobs):
+                    sys.exit(1)
+            else:
+                with open(script) as f:
+                    text = f.read()
+                if not shell.run_script(text, jobs=options.jobs):
+                    sys.exit(1)
+        finally:
+            # Collect the sessions before closing, as closing empties the pool
+            session_list = sessions.sessions
+            sessions.close()
+            profile = getattr(options, 'profile', None)
+            if profile is not None:
+                with open(profile, 'w') as f:
+                    fpgaedu.events.dump([s.events for s in session_list], f,
+                                        format=options.profile_format)
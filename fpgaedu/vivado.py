@@ -1,42 +1,95 @@
 import base64
+import concurrent.futures
+import contextlib
 import glob
+import hashlib
+import json
 import os
 import random
 import shutil
+import struct
 import subprocess
 import tempfile
+import threading
 import time
+import uuid
 import xml.etree.ElementTree as et
 
 import psutil
 
+import fpgaedu.bitstream
+import fpgaedu.events
 import fpgaedu.jsonrpc2
+import fpgaedu.scheduling
 
 DEFAULT_LINUX = '/opt/Xilinx'
 DEFAULT_WINDOWS = r'C:\Xilinx'
 USER_SETTINGS_LINUX = os.path.expanduser('~/.Xilinx/')
 USER_SETTINGS_WINDOWS = os.path.expanduser(r'~\AppData\Roaming\Xilinx')
+DEFAULT_HW_SERVER_URL = 'localhost:3121'
+# struct format characters of the supported register widths (in bytes).
+# Register values are transferred as little-endian unsigned integers.
+REGISTER_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+# Session health states, as determined by Session.check_health()
+HEALTH_UNKNOWN = 'unknown'
+HEALTH_OK = 'ok'
+HEALTH_DEGRADED = 'degraded'
+HEALTH_UNREACHABLE = 'unreachable'
 
-def locate():
+def read_installed_sw(path):
     '''
-    Attempts to find a vivado executable. First attempts to find the executable
-    that corresponds to the PATH's vivado command. If this is not set, the
-    Xilinx user settings directory's registry/installedSW.xml file is checked
-    for references to existing installations. If this file does not contain
-    usable references, Xilinx's default locations are checked for vivado
-    installations. These are /opt/Xilinx and C:\\Xilinx for Linux and Windows
-    respectively.
+    Return the set of (installedPath, version) records of a Xilinx
+    installedSW.xml registry file. The file is read incrementally and every
+    record is discarded once read, so that large registries are never held
+    in memory as a whole. Either member of a record may be None.
+    '''
+    records = set()
+    installed_path = version = None
+    root = None
+    depth = 0
+    for event, element in et.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if element.tag == 'installedPath':
+            installed_path = element.text
+        elif element.tag == 'version':
+            version = element.text
+        elif depth == 1:
+            # End of a record: the children of the root element
+            if installed_path is not None:
+                records.add((installed_path, version))
+            installed_path = version = None
+            # Detach the finished record, which the root would keep otherwise
+            root.clear()
+    return records
 
-    The function returns the path to a vivado executable or None if no
-    executable is found.
+def version_key(version):
     '''
+    Sort key for version strings such as 2016.4 or 2019.2.1.
+    '''
+    return tuple(int(part) if part.isdigit() else -1
+                 for part in version.split('.'))
 
-    # If the vivado executable is available from the current PATH, then
-    # return the path to that executable.
-    path_vivado = shutil.which('vivado')
-    if path_vivado:
-        return path_vivado
+def _probe_install_dir(install_dir):
+    # Assuming that every vivado installation is following the convention:
+    # [XIL DIR]/Vivado/[VERSION]/bin/vivado
+    glob_pattern = os.path.join(install_dir, 'Vivado', '*', 'bin', 'vivado')
+    return [(os.path.basename(os.path.dirname(os.path.dirname(match))), match)
+            for match in glob.glob(glob_pattern)]
 
+def locate_all(max_workers=8):
+    '''
+    Return a list of (version, path) tuples of all vivado executables found in
+    the Xilinx installation directories, sorted by ascending version. The
+    installation directories are Xilinx's default location and every
+    installedPath referenced in the Xilinx user settings directory's
+    registry/installedSW.xml file. The directories are probed concurrently,
+    as they are often located on slow network shares.
+    '''
     # Set variables based on the os type.
     if os.name == 'posix':
         user_settings = USER_SETTINGS_LINUX
@@ -49,27 +102,49 @@ def locate():
 
     # Look in the xilinx user settings installedSW.xml file for Xilinx
     # installation directories.
-    if os.path.exists(user_settings):
-        installed_sw = os.path.join(user_settings, 'registry', 'installedSW.xml')
-        installed_sw_xml = et.parse(installed_sw)
-        # Add every <installedPath> tag's contents to the set of Xilinx
-        # installation directories.
-        for element in installed_sw_xml.getroot().findall('*/installedPath'):
-            install_dirs.add(element.text)
-
-    # Look for vivado installations in every Xilinx installation directory.
-    # Assuming that every vivado installation is following the convention:
-    # [XIL DIR]/Vivado/[VERSION]/bin/vivado
+    installed_sw = os.path.join(user_settings, 'registry', 'installedSW.xml')
+    if os.path.exists(installed_sw):
+        install_dirs.update(installed_path for installed_path, _
+                            in read_installed_sw(installed_sw))
+
     vivado_paths = set()
-    for install_dir in install_dirs:
-        glob_pattern = os.path.join(install_dir, 'Vivado', '*', 'bin', 'vivado')
-        matches = glob.glob(glob_pattern)
-        vivado_paths.union(set(matches))
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        for matches in executor.map(_probe_install_dir, sorted(install_dirs)):
+            vivado_paths.update(matches)
+
+    return sorted(vivado_paths, key=lambda match: (version_key(match[0]), match[1]))
+
+def locate():
+    '''
+    Attempts to find a vivado executable. First attempts to find the executable
+    that corresponds to the PATH's vivado command. If this is not set, the
+    Xilinx user settings directory's registry/installedSW.xml file is checked
+    for references to existing installations. If this file does not contain
+    usable references, Xilinx's default locations are checked for vivado
+    installations. These are /opt/Xilinx and C:\\Xilinx for Linux and Windows
+    respectively.
+
+    The function returns the path to a vivado executable, the most recent
+    version if multiple are installed, or None if no executable is found.
+    '''
+
+    # If the vivado executable is available from the current PATH, then
+    # return the path to that executable.
+    path_vivado = shutil.which('vivado')
+    if path_vivado:
+        return path_vivado
 
+    vivado_paths = locate_all()
     if len(vivado_paths) == 0:
         return None
     else:
-        return vivado_paths.pop()
+        return vivado_paths[-1][1]
+
+class SessionError(Exception):
+    """
+    Class indicating that a session's Vivado process could not be started.
+    """
+    pass
 
 class SessionTimeoutError(Exception):
     """
@@ -77,44 +152,209 @@ class SessionTimeoutError(Exception):
     """
     pass
 
+def inventory_fingerprint(target_identifiers):
+    """
+    Return a fingerprint of a hardware server's inventory, based on the
+    identifiers of its targets. Target identifiers include the cable's serial
+    number, so that swapping boards changes the fingerprint.
+    """
+    data = json.dumps(sorted(target_identifiers)).encode()
+    return hashlib.sha1(data).hexdigest()
+
+class InventoryCache:
+    """
+    Cache of the device identifiers of every target of a hardware server,
+    shared by sessions so that a session connecting to an unchanged hardware
+    server can skip enumerating its devices. The targets themselves are still
+    listed by every session, as the fingerprint is computed from them. If a
+    path is provided, the cache is persisted in that JSON file and thus
+    shared between processes.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, key, fingerprint):
+        """
+        Return the cached mapping of target identifiers to device identifiers
+        for the hardware server, or None if its fingerprint does not match.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry['devices']
+
+    def put(self, key, fingerprint, devices):
+        with self._lock:
+            self._entries[key] = {'fingerprint': fingerprint, 'devices': devices}
+            if self.path is not None:
+                with open(self.path, 'w') as f:
+                    json.dump(self._entries, f)
+
 class Session:
     """
     Wrapper class that abstracts management of and interaction with a vivado
     process in which a server application is executed, allowing for interprocess
     communication between this class' process and Vivado's functionality.
+
+    A session may also address a server application that was started on
+    another host, in which case start() and stop() are not used.
+
+    A prepared session asks the server application, through the -prepare
+    Tcl argument, to connect to the hardware server while Vivado starts
+    instead of on the first request. Sessions sharing an InventoryCache reuse
+    each other's device enumeration while the hardware server's inventory
+    fingerprint is unchanged.
+
+    If scheduler_workers is set, calls from different threads sharing the
+    session are passed through a fpgaedu.scheduling.Scheduler, so that
+    interactive calls are not queued behind bulk calls such as program.
+    Setting admission_limits or rate_limit bounds the program and discovery
+    calls in flight through a fpgaedu.scheduling.AdmissionController, which
+    rejects calls with an OverloadedError when saturated. Both attribute
+    calls to the caller set using caller(), e.g. the student on whose behalf
+    a front end calls, and otherwise to the calling thread.
+
+    A session's health reflects the most recent health check. Running a
+    keepalive with start_keepalive() checks the health periodically and
+    reconnects to the hardware server as soon as the connection is found
+    lost, so that the first request after an idle period does not pay for it.
     """
-    def __init__(self, server_port=3742):
+    def __init__(self, server_port=3742, rpc_timeout=None, host='localhost',
+                 vivado_path=None, hw_server_url=None, prepare=False,
+                 inventory_cache=None, scheduler_workers=None,
+                 admission_limits=None, rate_limit=None,
+                 max_response_size=fpgaedu.jsonrpc2.DEFAULT_MAX_RESPONSE_SIZE):
+        self.events = fpgaedu.events.EventLog('session %s:%d' % (host, server_port))
         self._server_port = server_port
-        self._vivado_path = locate()
+        self._host = host
+        # Located on start, sessions of remote hosts never needing it
+        self._vivado_path = vivado_path
+        self._hw_server_url = hw_server_url
+        self._prepare = prepare
+        self._inventory_cache = inventory_cache
         self._process = None
         self._child_processes = []
         self._tcl_init_script = os.path.join(os.path.dirname(__file__), 'tcl', 'start.tcl')
-        self._rpc_endpoint = fpgaedu.jsonrpc2.TcpSocketEndpoint('localhost', server_port)
-        self._rpc_proxy = fpgaedu.jsonrpc2.Proxy(self._rpc_endpoint)
+        self._target_identifiers = None
+        self._device_identifiers = {}
+        self._health = HEALTH_UNKNOWN
+        self._last_ok = None
+        self._keepalive_thread = None
+        self._keepalive_stop = threading.Event()
+        self._usage = threading.Condition()
+        self._users = 0
+        self._checking = False
+        self._scheduler = None
+        self._rpc_endpoint = fpgaedu.jsonrpc2.TcpSocketEndpoint(
+            host, server_port, max_response_size=max_response_size)
+        self._rpc_proxy = fpgaedu.jsonrpc2.Proxy(self._rpc_endpoint,
+                                                 timeout=rpc_timeout)
+        if scheduler_workers is not None:
+            self._scheduler = fpgaedu.scheduling.Scheduler(
+                self._rpc_proxy, workers=scheduler_workers)
+            self._rpc_proxy = self._scheduler
+        if admission_limits is not None or rate_limit is not None:
+            self._rpc_proxy = fpgaedu.scheduling.AdmissionController(
+                self._rpc_proxy, limits=admission_limits, rate_limit=rate_limit)
 
     @property
     def server_port(self):
         return self._server_port
 
-    def start(self, timeout=30):
+    @property
+    def host(self):
+        return self._host
+
+    @property
+    def health(self):
+        """
+        One of HEALTH_UNKNOWN, HEALTH_OK, HEALTH_DEGRADED (the server
+        application responds, but the hardware server connection is lost)
+        and HEALTH_UNREACHABLE.
+        """
+        return self._health
+
+    @property
+    def last_ok(self):
+        """
+        Time (in seconds since the epoch) at which the session was last found
+        healthy, or None.
+        """
+        return self._last_ok
+
+    @property
+    def tcl_args(self):
+        """
+        Arguments passed to the Tcl init script.
+        """
+        args = ['-port', str(self._server_port)]
+        if self._hw_server_url is not None:
+            args += ['-hw_server', self._hw_server_url]
+        if self._prepare:
+            args.append('-prepare')
+        return args
+
+    def start(self, timeout=30, poll_interval=0.1):
         """
-        Start the Vivado session. A SessionTimeoutError is raised if the
-        specified timeout period has passed.
+        Start the Vivado session, polling the server application every
+        poll_interval seconds until it responds. A SessionTimeoutError is
+        raised if the specified timeout period has passed, and a SessionError
+        if no Vivado executable was found or it could not be executed. Unless
+        given on construction, the executable is located on the first start.
+
+        The startup phases are recorded in the session's event log: spawning
+        the process, the first connection attempt, the server accepting
+        connections and the server answering its first echo request.
         """
+        if self._vivado_path is None:
+            self._vivado_path = locate()
+        if self._vivado_path is None:
+            raise SessionError('no Vivado installation found')
         args = [self._vivado_path, '-mode', 'batch', '-nolog', '-nojournal',
-                '-notrace', '-source', self._tcl_init_script]
+                '-notrace', '-source', self._tcl_init_script,
+                '-tclargs'] + self.tcl_args
 
-        self._process = subprocess.Popen(args, shell=False, cwd=tempfile.mkdtemp(prefix='fpgaedu_session'))
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        with self.events.span('spawn', command=args):
+            try:
+                self._process = subprocess.Popen(args, shell=False, cwd=tempfile.mkdtemp(prefix='fpgaedu_session'))
+            except OSError as err:
+                raise SessionError('cannot execute %s: %s'
+                                   % (self._vivado_path, err)) from err
 
-        for _ in range(max(1, int(timeout))):
+        self.events.record('first-connect-attempt')
+        server_bound = False
+        while True:
             try:
                 self.echo()
-                return
-            except fpgaedu.jsonrpc2.RpcError:
-                time.sleep(1)
+            except fpgaedu.jsonrpc2.RpcError as err:
+                if not server_bound and \
+                        not isinstance(err, fpgaedu.jsonrpc2.EndpointError):
+                    server_bound = True
+                    self.events.record('server-bound')
+                if time.monotonic() + poll_interval >= deadline:
+                    break
+                time.sleep(poll_interval)
                 continue
+            if not server_bound:
+                self.events.record('server-bound')
+            self.events.record('ready', startup=time.perf_counter() - start_time)
+            self._health = HEALTH_OK
+            self._last_ok = time.time()
+            return
 
         # Timeout condition: kill all spawned processes and raise
+        self.events.record('timeout')
         self.stop()
         raise SessionTimeoutError
 
@@ -123,49 +363,473 @@ class Session:
         Stops this session's Vivado process by killing the current process
         and all child processes.
         """
+        self.stop_keepalive()
         if self._process is not None:
-            # Code derived from http://stackoverflow.com/a/4229404
-            parent_proc = psutil.Process(self._process.pid)
-            child_procs = parent_proc.children(recursive=True)
-            for child_proc in child_procs:
-                child_proc.kill()
-            psutil.wait_procs(child_procs)
-            parent_proc.kill()
-            parent_proc.wait()
-            self._process = None
+            with self.events.span('stop'):
+                # Code derived from http://stackoverflow.com/a/4229404
+                parent_proc = psutil.Process(self._process.pid)
+                child_procs = parent_proc.children(recursive=True)
+                for child_proc in child_procs:
+                    child_proc.kill()
+                psutil.wait_procs(child_procs)
+                parent_proc.kill()
+                parent_proc.wait()
+                self._process = None
+        if self._scheduler is not None:
+            self._scheduler.close()
+        self.invalidate_identifiers()
+        self._health = HEALTH_UNKNOWN
 
     def __del__(self):
         self.stop()
 
+    def caller(self, name):
+        """
+        Context manager attributing the calls made by the current thread
+        within its block to the named caller, for scheduling fairness and
+        per-caller rate limits.
+        """
+        return fpgaedu.scheduling.as_caller(name)
+
+    def _call(self, method, params=None):
+        with self.events.span(method, category='rpc'):
+            return self._rpc_proxy.call(method, params=params)
+
+    def _call_iter(self, method, params=None):
+        # Decode array results item by item instead of buffering and parsing
+        # the complete response, as inventories of large labs are long. The
+        # items are still collected into a list, the scheduler and admission
+        # wrappers doing so as well, so memory use is only bounded by the
+        # endpoint's max_response_size.
+        with self.events.span(method, category='rpc') as event_args:
+            result = list(self._rpc_proxy.call_iter(method, params=params))
+            event_args['items'] = len(result)
+            return result
+
+    def _call_binary(self, method, params=None, payload=b''):
+        with self.events.span(method, category='rpc',
+                              sent=len(payload)) as event_args:
+            result, response_payload = self._rpc_proxy.call_binary(
+                method, params=params, payload=payload)
+            event_args['received'] = len(response_payload)
+            return result, response_payload
+
     def echo(self):
         """
         Test the availability of the server application.
         """
         echo_params = {'echo': random.randint(0, 999)}
-        echo_result = self._rpc_proxy.call('echo', params=echo_params)
+        echo_result = self._call('echo', params=echo_params)
         if echo_params != echo_result:
             raise AssertionError
 
-    def program(self, target, device, bitstream):
+    def _set_health(self, health):
+        if health == HEALTH_OK:
+            self._last_ok = time.time()
+        if health != self._health:
+            self.events.record('health', category='keepalive', state=health)
+            self._health = health
+
+    def check_health(self, reconnect=True):
+        """
+        Probe the server application and its hardware server connection and
+        return the resulting health. If the hardware server connection is
+        lost and reconnect is set, the server application is requested to
+        reconnect, after which the cached identifiers are discarded.
+
+        Servers that do not report their hardware server connection in
+        response to the probe are considered connected.
+        """
+        echo_params = {'echo': random.randint(0, 999), 'probeHardware': True}
+        try:
+            echo_result = self._call('echo', params=echo_params)
+        except fpgaedu.jsonrpc2.RpcError:
+            self._set_health(HEALTH_UNREACHABLE)
+            return self._health
+        if not isinstance(echo_result, dict) or \
+                echo_result.get('echo') != echo_params['echo']:
+            self._set_health(HEALTH_UNREACHABLE)
+            return self._health
+
+        if echo_result.get('hardwareConnected', True):
+            self._set_health(HEALTH_OK)
+        elif not reconnect:
+            self._set_health(HEALTH_DEGRADED)
+        else:
+            params = {}
+            if self._hw_server_url is not None:
+                params['hwServerUrl'] = self._hw_server_url
+            try:
+                with self.events.span('hardware-reconnect', category='keepalive'):
+                    self._call('reconnectHardware', params=params)
+            except fpgaedu.jsonrpc2.RpcError:
+                self._set_health(HEALTH_DEGRADED)
+            else:
+                # Targets may have been plugged or unplugged meanwhile
+                self.invalidate_identifiers()
+                self._set_health(HEALTH_OK)
+        return self._health
+
+    @contextlib.contextmanager
+    def in_use(self):
         """
-        Program a board's fpga using the provided bitstream.
+        Context manager marking the session as in use, during which the
+        keepalive does not check its health. Entering waits for a health
+        check in progress to finish, so that checks never overlap the calls
+        made while in use.
+        """
+        with self._usage:
+            while self._checking:
+                self._usage.wait()
+            self._users += 1
+        try:
+            yield self
+        finally:
+            with self._usage:
+                self._users -= 1
+
+    def start_keepalive(self, interval=30):
+        """
+        Start a background thread checking the session's health every
+        interval seconds until stop_keepalive() or stop() is called. Checks
+        are skipped while the session is in use, see in_use().
+        """
+        if self._keepalive_thread is not None:
+            return
+        self._keepalive_stop.clear()
+        self._keepalive_thread = threading.Thread(
+            target=self._keepalive, args=(interval,), daemon=True,
+            name='keepalive %s:%d' % (self._host, self._server_port))
+        self._keepalive_thread.start()
+
+    def stop_keepalive(self):
+        """
+        Stop the keepalive thread, if running.
+        """
+        thread = self._keepalive_thread
+        if thread is None:
+            return
+        self._keepalive_stop.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        self._keepalive_thread = None
+
+    def _keepalive(self, interval):
+        while not self._keepalive_stop.wait(interval):
+            with self._usage:
+                if self._users:
+                    continue
+                self._checking = True
+            try:
+                self.check_health()
+            finally:
+                with self._usage:
+                    self._checking = False
+                    self._usage.notify_all()
+
+    def program(self, target, device, bitstream, idempotency_key=None,
+                retries=0):
         """
-        bitstream_base64 = base64.b64encode(bitstream)
+        Program a board's fpga using the provided bitstream, given either as
+        bytes or as a fpgaedu.bitstream.Bitstream. The latter's part is checked
+        against the device before anything is sent to the server.
+
+        Every program request carries an idempotency key, generated unless
+        provided. If the response is lost (an EndpointError or TimeoutError),
+        the request is retried up to retries times using the same key, so
+        that a server that already programmed the board only returns the
+        stored result instead of programming it again.
+        """
+        if isinstance(bitstream, fpgaedu.bitstream.Bitstream):
+            bitstream.check_device(device)
+            with bitstream.mapped() as bitstream_data:
+                bitstream_base64 = base64.b64encode(bitstream_data)
+        else:
+            bitstream_base64 = base64.b64encode(bitstream)
 
         program_params = {
             'target': target,
             'device': device,
-            'bitstream': bitstream_base64.decode()
+            'bitstream': bitstream_base64.decode(),
+            'idempotencyKey': idempotency_key or uuid.uuid4().hex
         }
 
-        self._rpc_proxy.call('program', params=program_params)
+        for attempt in range(retries + 1):
+            try:
+                self._call('program', params=program_params)
+                return
+            except (fpgaedu.jsonrpc2.EndpointError,
+                    fpgaedu.jsonrpc2.TimeoutError):
+                if attempt == retries:
+                    raise
+                self.events.record('program-retry', attempt=attempt + 1)
 
-    def get_target_identifiers(self):
-        return self._rpc_proxy.call('getTargetIdentifiers')
+    def read_memory(self, target, device, address, length):
+        """
+        Read length bytes of a device's memory starting at address. The data
+        is returned in the binary side channel of the response.
+        """
+        params = {
+            'target': target,
+            'device': device,
+            'address': address,
+            'length': length
+        }
+        _, data = self._call_binary('readMemory', params=params)
+        if len(data) != length:
+            raise fpgaedu.jsonrpc2.InvalidResponseError
+        return bytes(data)
 
-    def get_device_identifiers(self, target_identifier):
+    def write_memory(self, target, device, address, data):
+        """
+        Write data to a device's memory starting at address.
+        """
+        params = {
+            'target': target,
+            'device': device,
+            'address': address,
+            'length': len(data)
+        }
+        self._call_binary('writeMemory', params=params, payload=data)
 
+    def read_registers(self, target, device, addresses, width=4,
+                       as_numpy=False):
+        """
+        Read the registers at all provided addresses in a single call. The
+        values are returned as a list of ints or, if as_numpy is set, as a
+        NumPy array of unsigned integers of the given width (in bytes).
+        """
+        if width not in REGISTER_FORMATS:
+            raise ValueError('unsupported register width %d' % width)
+        addresses = [int(address) for address in addresses]
         params = {
-            'targetIdentifier': target_identifier
+            'target': target,
+            'device': device,
+            'addresses': addresses,
+            'width': width
         }
-        return self._rpc_proxy.call('getDeviceIdentifiers', params=params)
\ No newline at end of file
+        _, data = self._call_binary('readRegisters', params=params)
+        if len(data) != width * len(addresses):
+            raise fpgaedu.jsonrpc2.InvalidResponseError
+        if as_numpy:
+            import numpy
+            return numpy.frombuffer(bytes(data), dtype='<u%d' % width)
+        return list(struct.unpack('<%d%s' % (len(addresses),
+                                             REGISTER_FORMATS[width]), data))
+
+    def write_registers(self, target, device, addresses, values, width=4):
+        """
+        Write values to the registers at the provided addresses in a single
+        call. Values may be given as a sequence of ints or as a NumPy array.
+        """
+        if width not in REGISTER_FORMATS:
+            raise ValueError('unsupported register width %d' % width)
+        addresses = [int(address) for address in addresses]
+        if len(addresses) != len(values):
+            raise ValueError('got %d addresses but %d values'
+                             % (len(addresses), len(values)))
+        if hasattr(values, 'astype'):
+            data = values.astype('<u%d' % width).tobytes()
+        else:
+            data = struct.pack('<%d%s' % (len(values), REGISTER_FORMATS[width]),
+                               *values)
+        params = {
+            'target': target,
+            'device': device,
+            'addresses': addresses,
+            'width': width
+        }
+        self._call_binary('writeRegisters', params=params, payload=data)
+
+    def get_target_identifiers(self, refresh=False):
+        """
+        Return the identifiers of the targets connected to the hardware
+        server. Results are cached until refresh is set or the session stops.
+        """
+        targets = self._target_identifiers
+        if refresh or targets is None:
+            targets = self._call_iter('getTargetIdentifiers')
+            self._target_identifiers = targets
+        return targets
+
+    def get_device_identifiers(self, target_identifier, refresh=False):
+        """
+        Return the identifiers of the devices of a target. Results are cached
+        per target until refresh is set or the session stops.
+        """
+        # The keepalive may invalidate the cache at any time, so that the
+        # result must not be read back from it.
+        devices = self._device_identifiers.get(target_identifier)
+        if refresh or devices is None:
+            params = {
+                'targetIdentifier': target_identifier
+            }
+            devices = self._call_iter('getDeviceIdentifiers', params=params)
+            self._device_identifiers[target_identifier] = devices
+        return devices
+
+    def get_inventory(self, refresh=False):
+        """
+        Return a mapping of the identifiers of all targets to the identifiers
+        of their devices. If the session has an inventory cache holding an
+        entry with a matching fingerprint for its hardware server, device
+        enumeration is skipped.
+        """
+        targets = self.get_target_identifiers(refresh=refresh)
+        fingerprint = inventory_fingerprint(targets)
+        cache_key = '%s/%s' % (self._host,
+                               self._hw_server_url or DEFAULT_HW_SERVER_URL)
+
+        if self._inventory_cache is not None and not refresh:
+            devices = self._inventory_cache.get(cache_key, fingerprint)
+            if devices is not None:
+                self.events.record('inventory-cache-hit', fingerprint=fingerprint)
+                self._device_identifiers.update(devices)
+                return {target: devices[target] for target in targets}
+
+        inventory = {target: self.get_device_identifiers(target, refresh=refresh)
+                     for target in targets}
+        if self._inventory_cache is not None:
+            self._inventory_cache.put(cache_key, fingerprint, inventory)
+        return inventory
+
+    def invalidate_identifiers(self):
+        """
+        Discard cached target and device identifiers.
+        """
+        self._target_identifiers = None
+        self._device_identifiers = {}
+
+class SessionPool:
+    """
+    Pool of sessions that are started lazily on first use and reused
+    afterwards, so that only the first user of a session pays for Vivado's
+    startup. At most size sessions are created, each using its own server
+    port counting up from server_port.
+
+    Sessions are handed out for exclusive use, unless shared is set, in which
+    case a started session is handed out to several users at once. A new
+    session is then only created while every session is in use, and
+    otherwise the least used session is shared. Shared sessions should pass
+    their calls through a scheduler, see Session's scheduler_workers.
+
+    If keepalive_interval is set, every session runs a keepalive checking its
+    health at that interval while the session is not handed out, and idle
+    sessions found unreachable are restarted before being handed out.
+    """
+    def __init__(self, size=1, server_port=3742, session_factory=Session,
+                 keepalive_interval=None, shared=False):
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.shared = shared
+        self._server_port = server_port
+        self._session_factory = session_factory
+        self._sessions = []
+        self._idle = []
+        self._users = {}
+        self._starting = set()
+        self._condition = threading.Condition()
+
+    @property
+    def sessions(self):
+        return list(self._sessions)
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Context manager providing use of a started session, blocking until
+        one is available. The session is used exclusively unless the pool is
+        shared.
+        """
+        session = self._acquire_shared() if self.shared else self._acquire()
+        try:
+            with session.in_use():
+                yield session
+        finally:
+            with self._condition:
+                if self.shared:
+                    if session in self._users:
+                        self._users[session] -= 1
+                else:
+                    self._idle.append(session)
+                self._condition.notify_all()
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle and len(self._sessions) >= self.size:
+                self._condition.wait()
+            if self._idle:
+                session = self._idle.pop()
+                if session.health != HEALTH_UNREACHABLE:
+                    return session
+            else:
+                # Reserve a slot before starting, as starting takes a while
+                session = self._create()
+        self._start(session)
+        return session
+
+    def _acquire_shared(self):
+        with self._condition:
+            while True:
+                ready = [s for s in self._sessions if s not in self._starting]
+                unused = [s for s in ready if not self._users[s]]
+                if unused:
+                    session = unused[0]
+                    self._users[session] = 1
+                    if session.health != HEALTH_UNREACHABLE:
+                        return session
+                    break
+                if len(self._sessions) < self.size:
+                    session = self._create()
+                    self._users[session] = 1
+                    break
+                if ready:
+                    session = min(ready, key=self._users.get)
+                    self._users[session] += 1
+                    return session
+                self._condition.wait()
+            # Other users wait for the session until it has been started
+            self._starting.add(session)
+        self._start(session)
+        with self._condition:
+            self._starting.discard(session)
+            self._condition.notify_all()
+        return session
+
+    def _create(self):
+        port = self._server_port + len(self._sessions)
+        session = self._session_factory(server_port=port)
+        self._sessions.append(session)
+        return session
+
+    def _start(self, session):
+        try:
+            if session.health == HEALTH_UNREACHABLE:
+                self._restart(session)
+            else:
+                session.start()
+            if self.keepalive_interval is not None:
+                session.start_keepalive(self.keepalive_interval)
+        except BaseException:
+            with self._condition:
+                self._sessions.remove(session)
+                self._users.pop(session, None)
+                self._starting.discard(session)
+                self._condition.notify_all()
+            raise
+
+    def _restart(self, session):
+        session.events.record('restart', category='keepalive')
+        session.stop()
+        session.start()
+
+    def close(self):
+        """
+        Stop all sessions of this pool.
+        """
+        with self._condition:
+            sessions, self._sessions, self._idle = self._sessions, [], []
+            self._users.clear()
+            self._starting.clear()
+        for session in sessions:
+            session.stop()
\ No newline at end of file
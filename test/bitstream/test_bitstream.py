@@ -0,0 +1,112 @@
+import base64
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.bitstream
+import fpgaedu.vivado
+
+def make_bitstream(part='7a100tcsg324', payload=b'\xff' * 64, payload_length=None):
+    '''
+    Build the contents of a .bit file with the provided part and payload.
+    '''
+    def field(key, value):
+        value = value.encode() + b'\x00'
+        return key + struct.pack('>H', len(value)) + value
+
+    if payload_length is None:
+        payload_length = len(payload)
+
+    return (fpgaedu.bitstream.HEADER_MAGIC +
+            field(b'a', 'top;UserID=0XFFFFFFFF;Version=2016.4') +
+            field(b'b', part) +
+            field(b'c', '2017/04/05') +
+            field(b'd', '12:34:56') +
+            b'e' + struct.pack('>I', payload_length) + payload)
+
+class BitstreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fpgaedu_test')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, name='design.bit'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_load(self):
+        data = make_bitstream()
+        bitstream = fpgaedu.bitstream.load(self.write(data))
+        self.assertEqual(bitstream.design_name, 'top;UserID=0XFFFFFFFF;Version=2016.4')
+        self.assertEqual(bitstream.part, '7a100tcsg324')
+        self.assertEqual(bitstream.date, '2017/04/05')
+        self.assertEqual(bitstream.time, '12:34:56')
+        self.assertEqual(bitstream.payload_length, 64)
+        self.assertEqual(bitstream.read(), data)
+
+    def test_load_raises_invalid_header(self):
+        path = self.write(b'not a bitstream')
+        with self.assertRaises(fpgaedu.bitstream.BitstreamError):
+            fpgaedu.bitstream.load(path)
+
+    def test_load_raises_empty(self):
+        path = self.write(b'')
+        with self.assertRaises(fpgaedu.bitstream.BitstreamError):
+            fpgaedu.bitstream.load(path)
+
+    def test_load_raises_truncated_payload(self):
+        path = self.write(make_bitstream(payload_length=128))
+        with self.assertRaises(fpgaedu.bitstream.BitstreamError):
+            fpgaedu.bitstream.load(path)
+
+    def test_load_raises_truncated_header(self):
+        path = self.write(make_bitstream()[:20])
+        with self.assertRaises(fpgaedu.bitstream.BitstreamError):
+            fpgaedu.bitstream.load(path)
+
+    def test_load_cached(self):
+        path = self.write(make_bitstream())
+        bitstream = fpgaedu.bitstream.load(path)
+        with mock.patch('mmap.mmap') as mock_mmap:
+            self.assertIs(fpgaedu.bitstream.load(path), bitstream)
+            self.assertFalse(mock_mmap.called)
+
+    def test_load_cache_invalidated_on_change(self):
+        path = self.write(make_bitstream())
+        bitstream = fpgaedu.bitstream.load(path)
+        self.write(make_bitstream(part='7a35tcpg236'))
+        os.utime(path, ns=(0, 0))
+        reloaded = fpgaedu.bitstream.load(path)
+        self.assertIsNot(reloaded, bitstream)
+        self.assertEqual(reloaded.part, '7a35tcpg236')
+
+    def test_matches_device(self):
+        bitstream = fpgaedu.bitstream.load(self.write(make_bitstream()))
+        self.assertTrue(bitstream.matches_device('xc7a100t_0'))
+        self.assertTrue(bitstream.matches_device('XC7A100T'))
+        self.assertFalse(bitstream.matches_device('xc7a35t_0'))
+
+    def test_session_program_checks_part(self):
+        bitstream = fpgaedu.bitstream.load(self.write(make_bitstream()))
+        session = fpgaedu.vivado.Session()
+        session._rpc_proxy = mock.Mock()
+        with self.assertRaises(fpgaedu.bitstream.PartMismatchError):
+            session.program('target', 'xc7a35t_0', bitstream)
+        self.assertFalse(session._rpc_proxy.call.called)
+
+    def test_session_program_bitstream(self):
+        data = make_bitstream()
+        bitstream = fpgaedu.bitstream.load(self.write(data))
+        session = fpgaedu.vivado.Session()
+        session._rpc_proxy = mock.Mock()
+        session.program('target', 'xc7a100t_0', bitstream)
+        params = session._rpc_proxy.call.call_args[1]['params']
+        self.assertEqual(params['device'], 'xc7a100t_0')
+        self.assertEqual(base64.b64decode(params['bitstream']), data)
@@ -0,0 +1,132 @@
+import io
+import json
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.events
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+
+class EventLogTestCase(unittest.TestCase):
+
+    def test_record(self):
+        log = fpgaedu.events.EventLog('test')
+        log.record('event', value=1)
+        event, = log.events
+        self.assertEqual(event['name'], 'event')
+        self.assertIsNone(event['duration'])
+        self.assertEqual(event['args'], {'value': 1})
+
+    def test_span(self):
+        log = fpgaedu.events.EventLog('test')
+        with log.span('span') as args:
+            time.sleep(0.01)
+            args['extra'] = True
+        event, = log.events
+        self.assertGreaterEqual(event['duration'], 0.01)
+        self.assertEqual(event['args'], {'extra': True})
+
+    def test_span_records_error(self):
+        log = fpgaedu.events.EventLog('test')
+        with self.assertRaises(ValueError):
+            with log.span('span'):
+                raise ValueError
+        self.assertEqual(log.events[0]['args'], {'error': 'ValueError'})
+
+    def test_max_events(self):
+        log = fpgaedu.events.EventLog('test', max_events=2)
+        for i in range(3):
+            log.record('event%d' % i)
+        self.assertEqual([event['name'] for event in log.events],
+                         ['event1', 'event2'])
+
+    def test_to_json(self):
+        before = time.time()
+        log = fpgaedu.events.EventLog('test')
+        log.record('event')
+        after = time.time()
+        data = json.loads(json.dumps(log.to_json()))
+        self.assertEqual(data['name'], 'test')
+        # Event times derive from two clocks, allow for rounding between them
+        self.assertGreaterEqual(data['events'][0]['time'], before - 0.001)
+        self.assertLessEqual(data['events'][0]['time'], after + 0.001)
+
+    def test_to_chrome_trace(self):
+        log = fpgaedu.events.EventLog('test')
+        log.record('instant')
+        with log.span('span'):
+            pass
+        metadata, instant, span = log.to_chrome_trace(pid=3)
+        self.assertEqual(metadata['ph'], 'M')
+        self.assertEqual(instant['ph'], 'i')
+        self.assertEqual(span['ph'], 'X')
+        self.assertIn('dur', span)
+        self.assertEqual(span['pid'], 3)
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(fpgaedu.events.percentiles(values),
+                         {50: 50, 90: 90, 99: 99})
+        self.assertEqual(fpgaedu.events.percentiles([], points=(50,)),
+                         {50: None})
+
+    def test_dump(self):
+        logs = []
+        for startup in (1.0, 2.0, 3.0):
+            log = fpgaedu.events.EventLog('test')
+            log.record('ready', startup=startup)
+            logs.append(log)
+        for format in fpgaedu.events.FORMATS:
+            f = io.StringIO()
+            fpgaedu.events.dump(logs, f, format=format)
+            data = json.loads(f.getvalue())
+            if format == fpgaedu.events.FORMAT_CHROME:
+                latency = data['otherData']['startupLatency']
+                self.assertEqual(len(data['traceEvents']), 6)
+            else:
+                latency = data['startupLatency']
+                self.assertEqual(len(data['logs']), 3)
+            self.assertEqual(latency, {'p50': 2.0, 'p90': 3.0, 'p99': 3.0})
+
+class SessionEventsTestCase(unittest.TestCase):
+
+    @mock.patch('time.sleep')
+    @mock.patch('subprocess.Popen')
+    def test_start_timeline(self, mock_popen, _):
+        session = fpgaedu.vivado.Session()
+        session._vivado_path = 'vivado'
+        session._rpc_proxy = mock.Mock()
+
+        def call(method, params=None):
+            if call.attempts < 2:
+                call.attempts += 1
+                raise [fpgaedu.jsonrpc2.EndpointError,
+                       fpgaedu.jsonrpc2.InternalServerError('busy')][call.attempts - 1]
+            return params
+        call.attempts = 0
+        session._rpc_proxy.call.side_effect = call
+
+        session.start()
+        session._process = None
+
+        names = [event['name'] for event in session.events.events]
+        self.assertEqual(names, ['spawn', 'first-connect-attempt', 'echo', 'echo',
+                                 'server-bound', 'echo', 'ready'])
+        self.assertEqual(session.events.events[2]['args'],
+                         {'error': 'EndpointError'})
+        self.assertEqual(len(fpgaedu.events.startup_latencies([session.events])), 1)
+
+    def test_rpc_events(self):
+        session = fpgaedu.vivado.Session()
+        session._rpc_proxy = mock.Mock()
+        session._rpc_proxy.call_iter.return_value = iter(['target'])
+        session._rpc_proxy.call_binary.return_value = (None, b'\x00' * 16)
+        session.get_target_identifiers()
+        session.read_memory('target', 'device', 0, 16)
+        rpc_events = [event for event in session.events.events
+                      if event['category'] == 'rpc']
+        self.assertEqual([event['name'] for event in rpc_events],
+                         ['getTargetIdentifiers', 'readMemory'])
+        self.assertEqual(rpc_events[0]['args'], {'items': 1})
+        self.assertEqual(rpc_events[1]['args'], {'sent': 0, 'received': 16})
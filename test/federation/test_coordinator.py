@@ -0,0 +1,116 @@
+import concurrent.futures
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.federation
+import fpgaedu.jsonrpc2
+
+from test.standin import StandInServer
+
+def lab_host(name, targets=2, delay=0):
+    '''
+    Return a stand-in for a lab host's server application with the provided
+    number of targets, each having a single device.
+    '''
+    inventory = {'%s/target%d' % (name, i): ['xc7a100t_0'] for i in range(targets)}
+    server = StandInServer(methods={
+        'getTargetIdentifiers': lambda _: sorted(inventory),
+        'getDeviceIdentifiers': lambda params: inventory[params['targetIdentifier']],
+        'program': lambda _: None
+    }, delay=delay)
+    return server.start()
+
+class CoordinatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [lab_host('host%d' % i) for i in range(3)]
+        self.coordinator = fpgaedu.federation.Coordinator()
+        self.keys = [self.coordinator.register('localhost', server.port)
+                     for server in self.servers]
+        self.coordinator.refresh()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def programs(self, server):
+        return [request for request in server.requests
+                if request['method'] == 'program']
+
+    def test_inventory(self):
+        inventory = self.coordinator.inventory
+        self.assertEqual(sorted(inventory), sorted(self.keys))
+        self.assertEqual(inventory[self.keys[1]],
+                         {'host1/target0': ['xc7a100t_0'],
+                          'host1/target1': ['xc7a100t_0']})
+        self.assertEqual(len(self.coordinator.get_target_identifiers()), 6)
+
+    @mock.patch('fpgaedu.vivado.locate')
+    def test_register_does_not_locate_vivado(self, locate):
+        coordinator = fpgaedu.federation.Coordinator()
+        key = coordinator.register('localhost', self.servers[0].port)
+        coordinator.refresh()
+        self.assertEqual(len(coordinator.inventory[key]), 2)
+        self.assertFalse(locate.called)
+
+    def test_program_routed_to_owner(self):
+        self.coordinator.program('host2/target1', 'xc7a100t_0', b'bitstream')
+        self.assertEqual(len(self.programs(self.servers[2])), 1)
+        self.assertEqual(len(self.programs(self.servers[0])), 0)
+        self.assertEqual(len(self.programs(self.servers[1])), 0)
+
+    def test_program_raises_unknown_board(self):
+        with self.assertRaises(fpgaedu.federation.UnknownBoardError):
+            self.coordinator.program('host9/target0', 'xc7a100t_0', b'bitstream')
+        with self.assertRaises(fpgaedu.federation.UnknownBoardError):
+            self.coordinator.program('host0/target0', 'xc7a35t_0', b'bitstream')
+
+    def test_refresh_records_unreachable_host(self):
+        self.servers[0].stop()
+        self.coordinator.refresh()
+        self.assertEqual(self.coordinator.inventory[self.keys[0]], {})
+        self.assertIn(self.keys[0], self.coordinator.errors)
+        self.assertEqual(len(self.coordinator.get_target_identifiers()), 4)
+
+    def test_throughput_scales_with_hosts(self):
+        for server in self.servers:
+            server.delay = 0.1
+        targets = self.coordinator.get_target_identifiers()
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(len(targets)) as executor:
+            list(executor.map(lambda target: self.coordinator.program(
+                target, 'xc7a100t_0', b'bitstream'), targets))
+        duration = time.perf_counter() - start
+
+        # Six programs of 0.1 s on three hosts take two rounds, where a
+        # single host would take six.
+        self.assertGreaterEqual(duration, 0.2)
+        self.assertLess(duration, 0.5)
+
+    def test_refresh_times_out_hung_host(self):
+        coordinator = fpgaedu.federation.Coordinator(rpc_timeout=0.2)
+        hung = lab_host('hung', delay=2)
+        try:
+            key = coordinator.register('localhost', hung.port)
+            coordinator.register('localhost', self.servers[0].port)
+            start = time.perf_counter()
+            coordinator.refresh()
+            self.assertLess(time.perf_counter() - start, 1)
+            self.assertIsInstance(coordinator.errors[key],
+                                  fpgaedu.jsonrpc2.TimeoutError)
+            self.assertEqual(len(coordinator.get_target_identifiers()), 2)
+        finally:
+            hung.stop()
+
+    def test_periodic_refresh(self):
+        server = lab_host('host3')
+        try:
+            key = self.coordinator.register('localhost', server.port)
+            self.coordinator.start_refresh(interval=0.05)
+            time.sleep(0.3)
+            self.coordinator.stop_refresh()
+            self.assertEqual(len(self.coordinator.inventory[key]), 2)
+        finally:
+            server.stop()
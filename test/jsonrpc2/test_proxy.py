@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import unittest
 import unittest.mock as mock
 
@@ -290,4 +291,58 @@ class ProxyTestCase(unittest.TestCase):
     #     with self.assertRaises(fpgaedu.jsonrpc2.InvalidResponseError):
     #         proxy.call('test_method')
 
-    
\ No newline at end of file
+    
+    def test_call_timeout_sends_timeout(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = b'{"jsonrpc": "2.0", "id": 1, "result": null}'
+        proxy = Proxy(mock_endpoint)
+        proxy.call('test_method', timeout=5)
+        request_json, = mock_endpoint.communicate.call_args[0]
+        request = json.loads(request_json.decode())
+        self.assertEqual(request['timeout'], 5)
+        self.assertNotIn('deadline', request)
+        self.assertEqual(mock_endpoint.communicate.call_args[1], {'timeout': 5})
+
+    def test_call_default_timeout(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = b'{"jsonrpc": "2.0", "id": 1, "result": null}'
+        proxy = Proxy(mock_endpoint, timeout=3)
+        proxy.call('test_method')
+        self.assertEqual(mock_endpoint.communicate.call_args[1], {'timeout': 3})
+        proxy.call('test_method', timeout=1)
+        self.assertEqual(mock_endpoint.communicate.call_args[1], {'timeout': 1})
+
+    def test_call_without_timeout_sends_no_timeout(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = b'{"jsonrpc": "2.0", "id": 1, "result": null}'
+        proxy = Proxy(mock_endpoint)
+        proxy.call('test_method')
+        request_json, = mock_endpoint.communicate.call_args[0]
+        self.assertNotIn('timeout', json.loads(request_json.decode()))
+
+    def test_call_binary(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = fpgaedu.jsonrpc2.encode_frame(
+            b'{"jsonrpc": "2.0", "id": 1, "result": 2}', b'\x00\x01\x02')
+        proxy = Proxy(mock_endpoint)
+        result, payload = proxy.call_binary('test_method', payload=b'\xff\xfe')
+        self.assertEqual(result, 2)
+        self.assertEqual(bytes(payload), b'\x00\x01\x02')
+        request_data, = mock_endpoint.communicate.call_args[0]
+        request_json, request_payload = fpgaedu.jsonrpc2.decode_frame(request_data)
+        self.assertEqual(json.loads(request_json.decode())['method'], 'test_method')
+        self.assertEqual(bytes(request_payload), b'\xff\xfe')
+
+    def test_call_binary_unframed_response(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = b'{"jsonrpc": "2.0", "id": 1, "result": 2}'
+        proxy = Proxy(mock_endpoint)
+        self.assertEqual(proxy.call_binary('test_method'), (2, b''))
+
+    def test_call_raises_response_parse_error_truncated_frame(self):
+        mock_endpoint = mock.Mock()
+        mock_endpoint.communicate.return_value = fpgaedu.jsonrpc2.encode_frame(
+            b'{"jsonrpc": "2.0", "id": 1, "result": 2}', b'\x00\x01\x02')[:-1]
+        proxy = Proxy(mock_endpoint)
+        with self.assertRaises(fpgaedu.jsonrpc2.ResponseParseError):
+            proxy.call_binary('test_method')
@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+
+class RecentResultsTestCase(unittest.TestCase):
+
+    def test_execute_once_per_key(self):
+        results = fpgaedu.jsonrpc2.RecentResults()
+        function = mock.Mock(return_value=1)
+        self.assertEqual(results.execute('key', function), 1)
+        self.assertEqual(results.execute('key', function), 1)
+        self.assertEqual(function.call_count, 1)
+        results.execute('other', function)
+        self.assertEqual(function.call_count, 2)
+
+    def test_errors_not_stored(self):
+        results = fpgaedu.jsonrpc2.RecentResults()
+        function = mock.Mock(side_effect=[ValueError, 2])
+        with self.assertRaises(ValueError):
+            results.execute('key', function)
+        self.assertEqual(results.execute('key', function), 2)
+
+    @mock.patch('time.monotonic')
+    def test_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        results = fpgaedu.jsonrpc2.RecentResults(ttl=10)
+        function = mock.Mock(return_value=1)
+        results.execute('key', function)
+        mock_monotonic.return_value = 11
+        results.execute('key', function)
+        self.assertEqual(function.call_count, 2)
+
+    def test_max_entries(self):
+        results = fpgaedu.jsonrpc2.RecentResults(max_entries=2)
+        for key in range(5):
+            results.execute(key, lambda: None)
+            self.assertLessEqual(len(results), 2)
+        # The most recent results are kept
+        self.assertEqual(results.execute(4, lambda: 'again'), None)
+
+    def test_concurrent_duplicate_waits_for_first(self):
+        results = fpgaedu.jsonrpc2.RecentResults()
+        calls = []
+
+        def slow():
+            calls.append(None)
+            time.sleep(0.1)
+            return 'done'
+
+        outcomes = []
+        threads = [threading.Thread(target=lambda: outcomes.append(
+            results.execute('key', slow))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(outcomes, ['done'] * 3)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,138 @@
+import socketserver
+import threading
+import tracemalloc
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+
+from fpgaedu.jsonrpc2 import Proxy, TcpSocketEndpoint
+
+ITEM = b'"localhost:3121/xilinx_tcf/Digilent/210274000000"'
+
+class OversizedServer:
+    '''
+    Server replying to every request with a response holding a result array
+    of count items, generated while sending so that the server itself does
+    not hold the response in memory.
+    '''
+
+    def __init__(self, count):
+        self.count = count
+
+    def start(self):
+        count = self.count
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while self.request.recv(65536):
+                    pass
+                try:
+                    self.request.sendall(b'{"jsonrpc": "2.0", "id": 1, "result": [')
+                    batch = b','.join([ITEM] * 1000)
+                    for i in range(count // 1000):
+                        self.request.sendall((b',' if i else b'') + batch)
+                    self.request.sendall(b']}')
+                except OSError:
+                    pass
+
+        self._server = socketserver.ThreadingTCPServer(('localhost', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever,
+                         kwargs={'poll_interval': 0.05}, daemon=True).start()
+        return self
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class StreamingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # About 10 MB of response
+        self.count = 200 * 1000
+        self.server = OversizedServer(self.count).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_communicate_raises_response_too_large(self):
+        endpoint = TcpSocketEndpoint('localhost', self.server.port,
+                                     max_response_size=1024 * 1024)
+        tracemalloc.start()
+        try:
+            with self.assertRaises(fpgaedu.jsonrpc2.ResponseTooLargeError):
+                endpoint.communicate(b'{}')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 4 * 1024 * 1024)
+
+    def test_call_iter_bounded_memory(self):
+        endpoint = TcpSocketEndpoint('localhost', self.server.port,
+                                     max_response_size=None)
+        proxy = Proxy(endpoint)
+        tracemalloc.start()
+        try:
+            count = 0
+            for item in proxy.call_iter('getTargetIdentifiers'):
+                count += 1
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, self.count)
+        self.assertEqual(item, ITEM.decode().strip('"'))
+        self.assertLess(peak, 4 * 1024 * 1024)
+
+class CallIterTestCase(unittest.TestCase):
+
+    def call_iter(self, response, chunk_size=3):
+        endpoint = mock.Mock()
+        endpoint.communicate_iter.return_value = iter(chunked(response, chunk_size))
+        return list(Proxy(endpoint).call_iter('method'))
+
+    def test_call_iter(self):
+        response = b'{"jsonrpc": "2.0", "id": 1, "result": [1, 23456, "a\\u00e9", {"b": [true]}, null]}'
+        for chunk_size in (1, 3, 7, 1000):
+            self.assertEqual(self.call_iter(response, chunk_size),
+                             [1, 23456, 'aé', {'b': [True]}, None])
+
+    def test_call_iter_numbers_split(self):
+        response = b'{"jsonrpc": "2.0", "id": 1, "result": [1.5, 2e10, -3, 4.25E-2, 60]}'
+        for chunk_size in (1, 2):
+            self.assertEqual(self.call_iter(response, chunk_size),
+                             [1.5, 2e10, -3, 4.25e-2, 60])
+
+    def test_call_iter_multibyte_split(self):
+        response = '{"jsonrpc": "2.0", "id": 1, "result": ["ééé"]}'.encode()
+        self.assertEqual(self.call_iter(response, 1), ['ééé'])
+
+    def test_call_iter_empty(self):
+        self.assertEqual(self.call_iter(b'{"jsonrpc": "2.0", "id": 1, "result": []}'), [])
+
+    def test_call_iter_raises_server_error(self):
+        response = b'''{"jsonrpc": "2.0", "id": 1,
+                        "error": {"code": -32601, "message": "Unknown method"}}'''
+        with self.assertRaises(fpgaedu.jsonrpc2.UnknownMethodError):
+            self.call_iter(response)
+
+    def test_call_iter_raises_invalid_response(self):
+        for response in (b'{"jsonrpc": "2.0", "id": 1, "result": 1}',
+                         b'{"id": 1, "result": []}',
+                         b'{"jsonrpc": "2.0", "result": []}'):
+            with self.assertRaises(fpgaedu.jsonrpc2.InvalidResponseError):
+                self.call_iter(response)
+
+    def test_call_iter_raises_response_parse_error(self):
+        for response in (b'{"jsonrpc": "2.0", "id": 1, "result": [1, 2',
+                         b'{"jsonrpc": "2.0", "id": 1, "result": [1 2]}',
+                         b'not json'):
+            with self.assertRaises(fpgaedu.jsonrpc2.ResponseParseError):
+                self.call_iter(response)
@@ -29,3 +29,17 @@ class TcpSocketEndpointTestCase(unittest.TestCase):
         response = endpoint.communicate(b'test request')
 
         self.assertEqual(response, b'test response')
+
+    @mock.patch('socket.create_connection')
+    def test_communicate_raises_endpoint_error_without_response(self, mock_create_connection):
+
+        mock_socket = mock.Mock()
+        mock_socket.__enter__ = mock.Mock(return_value=mock_socket)
+        mock_socket.__exit__ = mock.Mock(return_value=False)
+        mock_socket.recv.side_effect = ([b''])
+        mock_create_connection.return_value = mock_socket
+
+        endpoint = fpgaedu.jsonrpc2.TcpSocketEndpoint('localhost', 12345)
+
+        with self.assertRaises(fpgaedu.jsonrpc2.EndpointError):
+            endpoint.communicate(b'test request')
@@ -0,0 +1,53 @@
+import socket
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+
+from test.standin import StandInServer
+
+class TimeoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer(delay=0.5).start()
+        endpoint = fpgaedu.jsonrpc2.TcpSocketEndpoint('localhost', self.server.port)
+        self.proxy = fpgaedu.jsonrpc2.Proxy(endpoint)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_call_timeout(self):
+        start = time.monotonic()
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            self.proxy.call('echo', params={'echo': 1}, timeout=0.1)
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_call_default_timeout(self):
+        self.proxy.timeout = 0.1
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            self.proxy.call('echo', params={'echo': 1})
+
+    def test_timeout_error_is_rpc_error(self):
+        with self.assertRaises(fpgaedu.jsonrpc2.RpcError):
+            self.proxy.call('echo', params={'echo': 1}, timeout=0.1)
+
+    def test_call_within_timeout(self):
+        result = self.proxy.call('echo', params={'echo': 1}, timeout=5)
+        self.assertEqual(result, {'echo': 1})
+
+    def test_server_drops_expired_request(self):
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            self.proxy.call('echo', params={'echo': 1}, timeout=0.1)
+        # Wait for the stand-in to finish processing the request
+        time.sleep(0.6)
+        self.assertEqual(len(self.server.dropped), 1)
+
+    @mock.patch('socket.create_connection', side_effect=socket.timeout)
+    def test_connect_timeout(self, create_connection):
+        # Stands in for a host that does not answer the connection attempt
+        endpoint = fpgaedu.jsonrpc2.TcpSocketEndpoint('localhost', self.server.port)
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            endpoint.communicate(b'{}', timeout=0.5)
+        timeout = create_connection.call_args[1]['timeout']
+        self.assertTrue(0 < timeout <= 0.5)
@@ -0,0 +1,155 @@
+import concurrent.futures
+import threading
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+import fpgaedu.scheduling
+import fpgaedu.vivado
+
+from test.standin import StandInServer
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    @mock.patch('time.monotonic')
+    def test_take(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        bucket = fpgaedu.scheduling.TokenBucket(rate=2, burst=2)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.5)
+        mock_monotonic.return_value = 0.5
+        self.assertEqual(bucket.take(), 0)
+
+class AdmissionControllerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.proxy = mock.Mock()
+        self.proxy.call.return_value = None
+
+    def test_passes_through_ungrouped_methods(self):
+        controller = fpgaedu.scheduling.AdmissionController(
+            self.proxy, limits={'program': (0, 0)})
+        controller.call('echo', params={'echo': 1})
+        self.proxy.call.assert_called_with('echo', params={'echo': 1})
+
+    def test_rejects_when_saturated(self):
+        controller = fpgaedu.scheduling.AdmissionController(
+            self.proxy, limits={'program': (0, 0)})
+        with self.assertRaises(fpgaedu.jsonrpc2.OverloadedError) as context:
+            controller.call('program')
+        self.assertGreater(context.exception.retry_after, 0)
+        self.assertFalse(self.proxy.call.called)
+        self.assertEqual(controller.metrics()['program']['rejected'], 1)
+
+    def test_queued_call_times_out(self):
+        controller = fpgaedu.scheduling.AdmissionController(
+            self.proxy, limits={'program': (0, 1)})
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            controller.call('program', timeout=0.05)
+        self.assertEqual(controller.metrics()['program']['queued'], 0)
+
+    def test_rate_limit_per_caller(self):
+        controller = fpgaedu.scheduling.AdmissionController(
+            self.proxy, rate_limit=(0.1, 2))
+        controller.call('getTargetIdentifiers', caller='alice')
+        controller.call('getTargetIdentifiers', caller='alice')
+        with self.assertRaises(fpgaedu.jsonrpc2.OverloadedError) as context:
+            controller.call('getTargetIdentifiers', caller='alice')
+        self.assertGreater(context.exception.retry_after, 5)
+        controller.call('getTargetIdentifiers', caller='bob')
+
+    def test_caller_context(self):
+        callers = []
+        self.proxy.call.side_effect = lambda method, **_: \
+            callers.append(fpgaedu.scheduling.current_caller())
+        controller = fpgaedu.scheduling.AdmissionController(
+            self.proxy, rate_limit=(0.1, 1))
+        with fpgaedu.scheduling.as_caller('alice'):
+            controller.call('getTargetIdentifiers')
+            with self.assertRaises(fpgaedu.jsonrpc2.OverloadedError):
+                controller.call('getTargetIdentifiers')
+        controller.call('getTargetIdentifiers', caller='bob')
+        # The wrapped proxy is called in the caller's context
+        self.assertEqual(callers, ['alice', 'bob'])
+
+class AdmissionLoadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        def program(_):
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.05)
+            with self.lock:
+                self.in_flight -= 1
+
+        self.server = StandInServer(methods={'program': program}).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_load(self):
+        session = fpgaedu.vivado.Session(server_port=self.server.port,
+                                         admission_limits={'program': (2, 4)})
+
+        def program(_):
+            try:
+                session.program('target', 'device', b'bitstream')
+                return None
+            except fpgaedu.jsonrpc2.OverloadedError as err:
+                return err
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(50) as executor:
+            results = list(executor.map(program, range(50)))
+        duration = time.perf_counter() - start
+
+        rejected = [result for result in results if result is not None]
+        admitted = len(results) - len(rejected)
+
+        self.assertLessEqual(self.max_in_flight, 2)
+        self.assertGreaterEqual(admitted, 6)
+        self.assertGreater(len(rejected), 0)
+        self.assertTrue(all(err.retry_after > 0 for err in rejected))
+        # Rejections are immediate, so the burst drains in a few rounds
+        self.assertLess(duration, 1.5, '%d admitted, %d rejected in %.3f s'
+                        % (admitted, len(rejected), duration))
+        metrics = session._rpc_proxy.metrics()['program']
+        self.assertEqual(metrics['admitted'] + metrics['rejected'], 50)
+
+class SessionInventoryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer(methods={
+            'getTargetIdentifiers': lambda _: ['target_a', 'target_b'],
+            'getDeviceIdentifiers': lambda params: [params['targetIdentifier'] + '_0']
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_inventory_through_wrappers(self):
+        session = fpgaedu.vivado.Session(server_port=self.server.port,
+                                         scheduler_workers=2,
+                                         admission_limits={'discovery': (1, 4)})
+        self.assertEqual(session.get_inventory(),
+                         {'target_a': ['target_a_0'], 'target_b': ['target_b_0']})
+        metrics = session._rpc_proxy.metrics()['discovery']
+        self.assertEqual(metrics['admitted'], 3)
+
+    def test_session_caller(self):
+        session = fpgaedu.vivado.Session(server_port=self.server.port,
+                                         scheduler_workers=2, rate_limit=(0.1, 1))
+        with session.caller('alice'):
+            session.get_target_identifiers()
+            with self.assertRaises(fpgaedu.jsonrpc2.OverloadedError):
+                session.get_target_identifiers(refresh=True)
+        with session.caller('bob'):
+            session.get_target_identifiers(refresh=True)
+        session.stop()
@@ -0,0 +1,165 @@
+import concurrent.futures
+import threading
+import time
+import unittest
+
+import fpgaedu.jsonrpc2
+import fpgaedu.scheduling
+import fpgaedu.vivado
+
+from test.standin import StandInServer
+
+class RecordingProxy:
+    '''
+    Proxy recording the order of calls, blocking every call until released.
+    '''
+
+    def __init__(self):
+        self.timeout = None
+        self.calls = []
+        self.release = threading.Semaphore(0)
+
+    def call(self, method, params=None, timeout=None):
+        self.calls.append((method, params))
+        self.release.acquire()
+        return params
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.proxy = RecordingProxy()
+        self.executor = concurrent.futures.ThreadPoolExecutor(32)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=False)
+
+    def submit(self, scheduler, method, caller, params=None):
+        future = self.executor.submit(scheduler.call, method, params=params,
+                                      caller=caller)
+        # Give the call time to be queued, so that submission order is kept
+        time.sleep(0.02)
+        return future
+
+    def drain(self, count):
+        for _ in range(count):
+            self.proxy.release.release()
+
+    def test_interactive_before_bulk(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        futures = [self.submit(scheduler, 'program', 'a', params=[i]) for i in range(3)]
+        futures.append(self.submit(scheduler, 'echo', 'b'))
+        self.drain(4)
+        concurrent.futures.wait(futures)
+        self.assertEqual([method for method, _ in self.proxy.calls],
+                         ['program', 'echo', 'program', 'program'])
+
+    def test_bulk_workers_reserve_interactive_worker(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        futures = [self.submit(scheduler, 'program', 'a') for _ in range(3)]
+        futures.append(self.submit(scheduler, 'getTargetIdentifiers', 'b'))
+        # One program is running, the interactive call takes the other worker
+        self.assertEqual([method for method, _ in self.proxy.calls],
+                         ['program', 'getTargetIdentifiers'])
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics['bulk']['depth'], 2)
+        self.assertEqual(metrics['bulk']['running'], 1)
+        self.drain(4)
+        concurrent.futures.wait(futures)
+
+    def test_fair_between_callers(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        futures = [self.submit(scheduler, 'program', 'a', params=['a', i])
+                   for i in range(4)]
+        futures.append(self.submit(scheduler, 'program', 'b', params=['b', 0]))
+        self.drain(5)
+        concurrent.futures.wait(futures)
+        callers = [params[0] for _, params in self.proxy.calls]
+        self.assertEqual(callers, ['a', 'a', 'b', 'a', 'a'])
+
+    def test_caller_context(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        self.drain(1)
+        with scheduler.caller('alice'):
+            scheduler.call('echo')
+        self.assertEqual(scheduler.metrics()['interactive']['completed'], 1)
+
+    def test_exception_propagates(self):
+        class FailingProxy:
+            timeout = None
+
+            def call(self, method, params=None):
+                raise fpgaedu.jsonrpc2.EndpointError
+
+        scheduler = fpgaedu.scheduling.Scheduler(FailingProxy(), workers=2)
+        with self.assertRaises(fpgaedu.jsonrpc2.EndpointError):
+            scheduler.call('echo')
+
+    def test_timeout_includes_queue_wait(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        blocking = [self.submit(scheduler, 'program', 'a'),
+                    self.submit(scheduler, 'echo', 'a')]
+        future = self.executor.submit(scheduler.call, 'echo', timeout=0.05)
+        time.sleep(0.1)
+        self.drain(2)
+        with self.assertRaises(fpgaedu.jsonrpc2.TimeoutError):
+            future.result()
+        for blocked in blocking:
+            blocked.result()
+        self.assertEqual(len(self.proxy.calls), 2)
+
+    def test_interactive_worker_reserved(self):
+        with self.assertRaises(ValueError):
+            fpgaedu.scheduling.Scheduler(self.proxy, workers=1)
+        with self.assertRaises(ValueError):
+            fpgaedu.scheduling.Scheduler(self.proxy, workers=3, bulk_workers=3)
+
+    def test_close_stops_workers(self):
+        scheduler = fpgaedu.scheduling.Scheduler(self.proxy, workers=2)
+        self.drain(2)
+        scheduler.call('echo')
+        threads = list(scheduler._threads)
+        scheduler.close()
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        # Workers are started again by later calls
+        self.assertEqual(scheduler.call('echo', params=[2]), [2])
+        scheduler.close()
+
+class SessionSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        def program(_):
+            time.sleep(0.5)
+
+        self.server = StandInServer(methods={'program': program}).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_echo_latency_during_bulk_programming(self):
+        session = fpgaedu.vivado.Session(server_port=self.server.port,
+                                         scheduler_workers=2)
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            programs = [executor.submit(session.program, 'target', 'device', b'bit')
+                        for _ in range(3)]
+            time.sleep(0.05)
+            latencies = []
+            for _ in range(5):
+                start = time.perf_counter()
+                session.echo()
+                latencies.append(time.perf_counter() - start)
+            concurrent.futures.wait(programs)
+
+        self.assertLess(max(latencies), 0.25)
+        metrics = session._rpc_proxy.metrics()
+        self.assertEqual(metrics['bulk']['completed'], 3)
+        self.assertEqual(metrics['interactive']['completed'], 5)
+        self.assertLess(metrics['interactive']['wait'][99], 0.25)
+
+    def test_stop_closes_scheduler(self):
+        session = fpgaedu.vivado.Session(server_port=self.server.port,
+                                         scheduler_workers=2)
+        session.echo()
+        threads = list(session._scheduler._threads)
+        self.assertEqual(len(threads), 2)
+        session.stop()
+        self.assertFalse(any(thread.is_alive() for thread in threads))
@@ -0,0 +1,153 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.vivado
+from fpgaedu.shell import ExperimentationShell
+from fpgaedu.shell import batch
+from fpgaedu.shell.commands import ProgramCommand
+
+from test.bitstream.test_bitstream import make_bitstream
+
+class SleepCommand:
+    '''
+    Command that sleeps on a board, recording the order of execution.
+    '''
+
+    name = 'sleep'
+
+    parser = argparse.ArgumentParser(name)
+    parser.add_argument('board')
+    parser.add_argument('seconds', type=float)
+
+    def __init__(self):
+        self.log = []
+        self.lock = threading.Lock()
+
+    def parse_args(self, argv):
+        return SleepCommand.parser.parse_args(argv[1:])
+
+    def resources(self, options):
+        return frozenset([options.board])
+
+    def run(self, options):
+        with self.lock:
+            self.log.append(('start', options.board))
+        time.sleep(options.seconds)
+        with self.lock:
+            self.log.append(('end', options.board))
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sleep = SleepCommand()
+        self.commands = {'sleep': self.sleep, 'program': ProgramCommand()}
+
+    def test_parse_script(self):
+        script = batch.parse_script(
+            '# comment\n'
+            '\n'
+            'program "my design.bit" target device  # trailing comment\n',
+            self.commands)
+        self.assertEqual(len(script), 1)
+        self.assertEqual(script[0].lineno, 3)
+        self.assertEqual(script[0].options.bitstream, 'my design.bit')
+        self.assertEqual(script[0].resources, frozenset(['target']))
+
+    def test_program_serialized_per_target(self):
+        script = batch.parse_script('program a.bit target device_0\n'
+                                    'program b.bit target device_1\n'
+                                    'program c.bit other device_0\n',
+                                    self.commands)
+        self.assertTrue(script[0].conflicts(script[1].resources))
+        self.assertFalse(script[0].conflicts(script[2].resources))
+
+    def test_parse_script_raises_unknown_command(self):
+        with self.assertRaises(batch.ScriptError) as context:
+            batch.parse_script('sleep a 0\nunknown\n', self.commands)
+        self.assertEqual(context.exception.lineno, 2)
+
+    def test_parse_script_raises_invalid_arguments(self):
+        with self.assertRaises(batch.ScriptError):
+            batch.parse_script('program only_bitstream\n', self.commands)
+
+    def test_run_script_concurrent(self):
+        script = batch.parse_script('sleep a 0.2\nsleep b 0.2\nsleep c 0.2\n',
+                                    self.commands)
+        start = time.perf_counter()
+        batch.run_script(script, jobs=3)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(all(cmd.duration >= 0.2 for cmd in script))
+
+    def test_run_script_preserves_order_per_resource(self):
+        script = batch.parse_script('sleep a 0.1\nsleep b 0.1\nsleep a 0\n',
+                                    self.commands)
+        batch.run_script(script, jobs=3)
+        a_events = [event for event in self.sleep.log if event[1] == 'a']
+        self.assertEqual(a_events, [('start', 'a'), ('end', 'a'),
+                                    ('start', 'a'), ('end', 'a')])
+
+    def test_run_script_jobs_limit(self):
+        script = batch.parse_script('sleep a 0.1\nsleep b 0.1\n', self.commands)
+        start = time.perf_counter()
+        batch.run_script(script, jobs=1)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    def test_shell_run_script_summary(self):
+        shell = ExperimentationShell()
+        shell.commands = self.commands
+        out = io.StringIO()
+        self.assertTrue(shell.run_script('sleep a 0\nsleep b 0\n', file=out))
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('sleep b 0', lines[2])
+        self.assertTrue(lines[3].startswith('2 commands'))
+
+    def test_shell_run_script_reports_parse_error(self):
+        shell = ExperimentationShell()
+        shell.commands = self.commands
+        out = io.StringIO()
+        self.assertFalse(shell.run_script('unknown\n', file=out))
+        self.assertFalse(self.sleep.log)
+
+class SharedSessionBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.session = mock.MagicMock()
+        self.session.program.side_effect = self.program
+        self.pool = fpgaedu.vivado.SessionPool(
+            session_factory=lambda server_port: self.session, shared=True)
+        self.directory = tempfile.mkdtemp(prefix='fpgaedu_test')
+        self.bitstream_path = os.path.join(self.directory, 'design.bit')
+        with open(self.bitstream_path, 'wb') as f:
+            f.write(make_bitstream())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def program(self, target, device, bitstream):
+        start = time.perf_counter()
+        time.sleep(0.2)
+        self.calls.append((target, start, time.perf_counter()))
+
+    def test_programs_overlap_on_one_session(self):
+        shell = ExperimentationShell(sessions=self.pool)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertTrue(shell.run_script(
+                'program "%s" target_a xc7a100t_0\n'
+                'program "%s" target_b xc7a100t_0\n'
+                % (self.bitstream_path, self.bitstream_path), jobs=2, file=out))
+        (_, start_a, end_a), (_, start_b, end_b) = self.calls
+        self.assertLess(max(start_a, start_b), min(end_a, end_b),
+                        'programs did not overlap: %r' % self.calls)
+        self.assertEqual(len(self.pool.sessions), 1)
+        self.session.start.assert_called_once_with()
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.bitstream
+import fpgaedu.vivado
+from fpgaedu.shell import ExperimentationShell
+from fpgaedu.shell.commands import DevicesCommand, ProgramCommand, TargetsCommand
+
+from test.bitstream.test_bitstream import make_bitstream
+
+class CommandsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.MagicMock()
+        self.session.get_target_identifiers.return_value = ['target_a', 'target_b']
+        self.session.get_device_identifiers.return_value = ['xc7a100t_0']
+        self.pool = fpgaedu.vivado.SessionPool(
+            session_factory=lambda server_port: self.session)
+        self.shell = ExperimentationShell(sessions=self.pool)
+        self.shell.add_command(ProgramCommand())
+        self.shell.add_command(TargetsCommand())
+        self.shell.add_command(DevicesCommand())
+        self.directory = tempfile.mkdtemp(prefix='fpgaedu_test')
+        self.bitstream_path = os.path.join(self.directory, 'design.bit')
+        with open(self.bitstream_path, 'wb') as f:
+            f.write(make_bitstream())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_line(self, line):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.shell.onecmd(line)
+        return out.getvalue()
+
+    def test_program(self):
+        self.run_line('program "%s" target_a xc7a100t_0' % self.bitstream_path)
+        target, device, bitstream = self.session.program.call_args[0]
+        self.assertEqual((target, device), ('target_a', 'xc7a100t_0'))
+        self.assertEqual(bitstream.path, self.bitstream_path)
+
+    def test_program_rejects_part_mismatch_without_session(self):
+        output = self.run_line('program "%s" target_a xc7a35t_0' % self.bitstream_path)
+        self.assertIn('PartMismatchError', output)
+        self.assertFalse(self.session.start.called)
+
+    def test_session_shared_across_commands(self):
+        self.run_line('targets')
+        self.run_line('devices target_a')
+        self.run_line('program "%s" target_a xc7a100t_0' % self.bitstream_path)
+        self.session.start.assert_called_once_with()
+
+    def test_targets(self):
+        output = self.run_line('targets')
+        self.assertEqual(output.split(), ['target_a', 'target_b'])
+        self.session.get_target_identifiers.assert_called_with(refresh=False)
+
+    def test_devices_refresh(self):
+        output = self.run_line('devices target_a --refresh')
+        self.assertEqual(output.split(), ['xc7a100t_0'])
+        self.session.get_device_identifiers.assert_called_with('target_a',
+                                                               refresh=True)
+
+class VivadoNotInstalledTestCase(unittest.TestCase):
+
+    def run_line(self, shell, line):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            shell.onecmd(line)
+        return out.getvalue()
+
+    @mock.patch('fpgaedu.vivado.locate', return_value=None)
+    def test_not_installed(self, locate):
+        pool = fpgaedu.vivado.SessionPool()
+        shell = ExperimentationShell(sessions=pool)
+        output = self.run_line(shell, 'targets')
+        self.assertIn('SessionError: no Vivado installation found', output)
+        self.assertEqual(pool.sessions, [])
+
+    def test_not_executable(self):
+        directory = tempfile.mkdtemp(prefix='fpgaedu_test')
+        self.addCleanup(shutil.rmtree, directory)
+        vivado_path = os.path.join(directory, 'vivado')
+        pool = fpgaedu.vivado.SessionPool(session_factory=lambda server_port:
+            fpgaedu.vivado.Session(server_port=server_port, vivado_path=vivado_path))
+        shell = ExperimentationShell(sessions=pool)
+        output = self.run_line(shell, 'targets')
+        self.assertIn('SessionError: cannot execute %s' % vivado_path, output)
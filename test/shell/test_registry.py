@@ -0,0 +1,114 @@
+import contextlib
+import importlib
+import importlib.metadata
+import io
+import os
+import subprocess
+import sys
+import unittest
+import unittest.mock as mock
+
+from fpgaedu.shell import ExperimentationShell
+from fpgaedu.shell import batch
+from fpgaedu.shell import registry
+
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+class HelloCommand:
+
+    name = 'hello'
+    description = 'greet the lab'
+
+    def __init__(self, sessions=None):
+        self.sessions = sessions
+
+    def parse_args(self, argv):
+        return argv[1:]
+
+    def execute(self, argv):
+        print('hello %s' % ' '.join(self.parse_args(argv)))
+
+def entry_points(group):
+    if group != registry.ENTRY_POINT_GROUP:
+        return []
+    return [importlib.metadata.EntryPoint(
+        'hello', 'test.shell.test_registry:HelloCommand', group)]
+
+class CommandRegistryTestCase(unittest.TestCase):
+
+    def run_line(self, shell, line):
+        out = io.StringIO()
+        shell.stdout = out
+        with contextlib.redirect_stdout(out):
+            shell.onecmd(line)
+        return out.getvalue()
+
+    def test_builtin_descriptions(self):
+        for name, (target, description) in registry.BUILTIN_COMMANDS.items():
+            module_name, _, class_name = target.partition(':')
+            command_class = getattr(importlib.import_module(module_name), class_name)
+            self.assertEqual(command_class.name, name)
+            self.assertEqual(command_class.description, description)
+
+    def test_lazy_load(self):
+        sessions = object()
+        commands = registry.CommandRegistry(sessions=sessions)
+        commands.register('hello', 'test.shell.test_registry:HelloCommand')
+        self.assertIn('hello', commands)
+        self.assertFalse(commands.is_loaded('hello'))
+        command = commands['hello']
+        self.assertIsInstance(command, HelloCommand)
+        self.assertIs(command.sessions, sessions)
+        self.assertIs(commands['hello'], command)
+        self.assertEqual(commands.description('hello'), 'greet the lab')
+
+    @mock.patch('importlib.metadata.entry_points', entry_points)
+    def test_entry_points(self):
+        shell = ExperimentationShell()
+        self.assertEqual(list(shell.commands),
+                         ['devices', 'hello', 'program', 'targets'])
+        self.assertIn('hello', self.run_line(shell, 'help'))
+        self.assertEqual(shell.commands.description('hello'), '')
+        self.assertFalse(shell.commands.is_loaded('hello'))
+        self.assertEqual(self.run_line(shell, 'hello world'), 'hello world\n')
+
+    def test_load_error(self):
+        shell = ExperimentationShell(commands=registry.CommandRegistry())
+        shell.commands.register('broken', 'fpgaedu.nonexistent:BrokenCommand')
+        self.assertIn('broken', self.run_line(shell, 'help'))
+        self.assertIn('cannot load command broken', self.run_line(shell, 'help broken'))
+        self.assertIn('cannot load command broken', self.run_line(shell, 'broken'))
+        with self.assertRaises(batch.ScriptError):
+            batch.parse_script('broken\n', shell.commands)
+
+    def test_complete_without_import(self):
+        shell = ExperimentationShell()
+        self.assertEqual(shell.completenames('p'), ['program'])
+        self.assertIn('exit', shell.completenames(''))
+        self.assertFalse(any(shell.commands.is_loaded(name)
+                             for name in shell.commands))
+
+    def test_help(self):
+        shell = ExperimentationShell()
+        self.assertIn('list the devices of a target', self.run_line(shell, 'help'))
+        self.assertFalse(shell.commands.is_loaded('devices'))
+        self.assertIn('usage: devices', self.run_line(shell, 'help devices'))
+
+    def test_startup_imports(self):
+        # Run in a fresh interpreter, as other tests import the commands
+        code = ('import sys, time\n'
+                'start = time.perf_counter()\n'
+                'import fpgaedu\n'
+                'from fpgaedu.shell import ExperimentationShell\n'
+                'shell = ExperimentationShell()\n'
+                'shell.completenames("")\n'
+                'shell.onecmd("help")\n'
+                'print(time.perf_counter() - start)\n'
+                'print(sorted(m for m in sys.modules\n'
+                '             if m.startswith("fpgaedu.shell.commands.")))\n')
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=root_dir, universal_newlines=True)
+        lines = output.splitlines()
+        self.assertEqual(lines[-1], '[]')
+        self.assertLess(float(lines[-2]), 5, 'shell startup in %.3f s'
+                        % float(lines[-2]))
@@ -0,0 +1,114 @@
+import json
+import socketserver
+import threading
+import time
+
+import fpgaedu.jsonrpc2
+
+def echo(params):
+    return params
+
+class StandInServer:
+    '''
+    Minimal JSON-RPC 2.0 server standing in for the Vivado server application.
+    Every connection carries a single request, terminated by the client
+    shutting down its write side, after which the response is sent and the
+    connection is closed.
+
+    Methods are plain callables taking the request's params. Binary methods
+    take the request's params and binary payload and return a tuple of the
+    result and a binary payload, which is sent back in a frame. The delay (in
+    seconds) is applied before every response, mimicking a slow Vivado. While
+    drop_responses is positive, requests are processed but the connection is
+    closed without a response, and drop_responses is decremented.
+    '''
+
+    def __init__(self, methods=None, binary_methods=None, delay=0):
+        self.methods = {'echo': echo}
+        self.methods.update(methods or {})
+        self.binary_methods = dict(binary_methods or {})
+        self.delay = delay
+        self.drop_responses = 0
+        self.requests = []
+        self.dropped = []
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self, port=0):
+        standin = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                packets = []
+                while True:
+                    packet = self.request.recv(65536)
+                    if not packet:
+                        break
+                    packets.append(packet)
+                response = standin.handle(b''.join(packets))
+                if response is not None:
+                    try:
+                        self.request.sendall(response)
+                    except OSError:
+                        pass
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(('localhost', port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05},
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+    def handle(self, request_data):
+        request_json, request_payload = fpgaedu.jsonrpc2.decode_frame(request_data)
+        request = json.loads(request_json.decode())
+        received = time.monotonic()
+        self.requests.append(request)
+        if self.delay:
+            time.sleep(self.delay)
+        if 'timeout' in request and \
+                time.monotonic() > received + request['timeout']:
+            self.dropped.append(request)
+            return None
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        response_payload = b''
+        try:
+            if request['method'] in self.binary_methods:
+                method = self.binary_methods[request['method']]
+                response['result'], response_payload = method(
+                    request.get('params'), bytes(request_payload))
+            elif request['method'] in self.methods:
+                method = self.methods[request['method']]
+                response['result'] = method(request.get('params'))
+            else:
+                raise fpgaedu.jsonrpc2.UnknownMethodError('Unknown method')
+        except fpgaedu.jsonrpc2.ServerError as err:
+            response['error'] = {'code': err.code, 'message': err.message}
+            if err.data is not None:
+                response['error']['data'] = err.data
+        response_json = json.dumps(response).encode()
+        if self.drop_responses > 0:
+            self.drop_responses -= 1
+            self.dropped.append(request)
+            return None
+        if response_payload:
+            return fpgaedu.jsonrpc2.encode_frame(response_json, response_payload)
+        return response_json
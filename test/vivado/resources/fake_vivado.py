@@ -0,0 +1,71 @@
+'''
+Stand-in for the vivado executable. Accepts Vivado's command line, waits for
+the startup delay and serves the hardware server inventory on the port passed
+through -tclargs. The hardware server is connected to during startup if
+-prepare is passed, and otherwise on the first request needing it. Delays are
+read from the environment:
+
+    FAKE_VIVADO_STARTUP_DELAY      seconds before the server binds
+    FAKE_VIVADO_CONNECT_DELAY      seconds to connect to the hardware server
+    FAKE_VIVADO_ENUMERATION_DELAY  seconds per getDeviceIdentifiers call
+'''
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from test.standin import StandInServer
+
+class HardwareServer:
+    '''
+    Connection to the stand-in hardware server at the provided URL.
+    '''
+
+    def __init__(self, url):
+        self.inventory = {
+            '%s/xilinx_tcf/Digilent/210274%d' % (url, i): ['xc7a100t_0']
+            for i in range(3)
+        }
+        self._connected = False
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            if not self._connected:
+                time.sleep(float(os.environ.get('FAKE_VIVADO_CONNECT_DELAY', 0)))
+                self._connected = True
+
+    def get_target_identifiers(self, _):
+        self.connect()
+        return sorted(self.inventory)
+
+    def get_device_identifiers(self, params):
+        self.connect()
+        time.sleep(float(os.environ.get('FAKE_VIVADO_ENUMERATION_DELAY', 0)))
+        return self.inventory[params['targetIdentifier']]
+
+def main(argv):
+    tcl_args = argv[argv.index('-tclargs') + 1:]
+    port = int(tcl_args[tcl_args.index('-port') + 1])
+    hw_server_url = 'localhost:3121'
+    if '-hw_server' in tcl_args:
+        hw_server_url = tcl_args[tcl_args.index('-hw_server') + 1]
+
+    time.sleep(float(os.environ.get('FAKE_VIVADO_STARTUP_DELAY', 0)))
+
+    hw_server = HardwareServer(hw_server_url)
+    if '-prepare' in tcl_args:
+        hw_server.connect()
+
+    server = StandInServer(methods={
+        'getTargetIdentifiers': hw_server.get_target_identifiers,
+        'getDeviceIdentifiers': hw_server.get_device_identifiers
+    })
+    server.start(port=port)
+    while True:
+        time.sleep(1)
+
+if __name__ == '__main__':
+    main(sys.argv)
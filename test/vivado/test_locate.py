@@ -1,12 +1,17 @@
 
+import copy
 import os
+import tempfile
+import time
 import unittest
 import unittest.mock as mock
 import xml.etree.ElementTree as et
 import fpgaedu.vivado
 
 curr_dir = os.path.dirname(__file__)
-installedSW1 = et.parse(os.path.join(curr_dir, 'resources', 'installedSW1.xml'))
+installedSW1_path = os.path.join(curr_dir, 'resources', 'installedSW1.xml')
+installedSW1 = et.parse(installedSW1_path)
+iterparse = et.iterparse
 
 class LocateTestCase(unittest.TestCase):
 
@@ -21,19 +26,92 @@ class LocateTestCase(unittest.TestCase):
         # self.assertEqual(location, 'some/test/directory/to/executable')
 
     @mock.patch("os.name", 'posix')
-    @mock.patch("xml.etree.ElementTree.parse")
+    @mock.patch("glob.glob")
+    @mock.patch("os.path.exists")
+    @mock.patch("xml.etree.ElementTree.iterparse")
     @mock.patch("shutil.which")
-    def test_locate_from_user_settings(self, mock_which, mock_parse):
+    def test_locate_from_user_settings(self, mock_which, mock_iterparse,
+                                       mock_exists, mock_glob):
         # Initialize
+        installed_sw_path = os.path.expanduser('~/.Xilinx/registry/installedSW.xml')
         mock_which.return_value = None
-        mock_parse.return_value = installedSW1
+        mock_iterparse.side_effect = lambda _, events: iterparse(installedSW1_path, events)
+        mock_exists.side_effect = lambda path: path == installed_sw_path
+        mock_glob.side_effect = lambda pattern: \
+            ['/home/matthijsbos/Xilinx/Vivado/2016.4/bin/vivado'] \
+            if pattern.startswith('/home/matthijsbos/Xilinx/') else []
         # Call
         location = fpgaedu.vivado.locate()
         # Assert
         mock_which.assert_called_with('vivado')
-        mock_parse.assert_called_with(os.path.expanduser('~/.Xilinx/registry/installedSW.xml'))
-        # xilinx_installed_sw_path = os.path.join('~', '.Xilinx', 'registry',
-        #                                         'installedSW.xml')
+        mock_iterparse.assert_called_with(installed_sw_path, events=('start', 'end'))
+        self.assertEqual(location, "/home/matthijsbos/Xilinx/Vivado/2016.4/bin/vivado")
 
-        # self.assertEqual(location, "/home/matthijsbos/Xilinx/Vivado/2016.4/bin/vivado")
+    def test_read_installed_sw(self):
+        records = fpgaedu.vivado.read_installed_sw(installedSW1_path)
+        self.assertEqual(records, {('/home/matthijsbos/Xilinx', '2016.4')})
 
+    def test_read_installed_sw_discards_records(self):
+        root = installedSW1.getroot()
+        template = root.find('uninstallRegistry')
+        synthetic = et.Element(root.tag)
+        for _ in range(2000):
+            synthetic.append(copy.deepcopy(template))
+        sizes = []
+
+        def tracking_iterparse(source, events):
+            root = None
+            for event, element in iterparse(source, events):
+                root = element if root is None else root
+                yield event, element
+                sizes.append(len(root))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'installedSW.xml')
+            et.ElementTree(synthetic).write(path)
+            with mock.patch('xml.etree.ElementTree.iterparse', tracking_iterparse):
+                fpgaedu.vivado.read_installed_sw(path)
+        # Only the records parsed ahead of the current one are held
+        self.assertLess(max(sizes), 200)
+        self.assertEqual(sizes[-1], 0)
+
+    @mock.patch("os.name", 'posix')
+    @mock.patch("shutil.which")
+    def test_locate_newest_version(self, mock_which):
+        mock_which.return_value = None
+        with tempfile.TemporaryDirectory() as install_dir:
+            for version in ['2016.4', '2017.10', '2017.2']:
+                bin_dir = os.path.join(install_dir, 'Vivado', version, 'bin')
+                os.makedirs(bin_dir)
+                open(os.path.join(bin_dir, 'vivado'), 'w').close()
+            with mock.patch('fpgaedu.vivado.DEFAULT_LINUX', install_dir), \
+                 mock.patch('fpgaedu.vivado.USER_SETTINGS_LINUX',
+                            os.path.join(install_dir, 'none')):
+                versions = fpgaedu.vivado.locate_all()
+                location = fpgaedu.vivado.locate()
+        self.assertEqual([version for version, _ in versions],
+                         ['2016.4', '2017.2', '2017.10'])
+        self.assertEqual(location, os.path.join(install_dir, 'Vivado', '2017.10',
+                                                'bin', 'vivado'))
+
+    def test_read_installed_sw_benchmark(self):
+        # Synthetic registry of a shared build server, with thousands of
+        # records spread over a hundred installation directories.
+        root = installedSW1.getroot()
+        template = root.findall('uninstallRegistry')
+        synthetic = et.Element(root.tag)
+        for index in range(5000):
+            record = copy.deepcopy(template[index % len(template)])
+            record.find('installedPath').text = '/opt/Xilinx%d' % (index % 100)
+            record.find('version').text = '2016.%d' % (index // 100 % 4 + 1)
+            synthetic.append(record)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'installedSW.xml')
+            et.ElementTree(synthetic).write(path)
+            start = time.perf_counter()
+            records = fpgaedu.vivado.read_installed_sw(path)
+            duration = time.perf_counter() - start
+        self.assertEqual(len({path for path, _ in records}), 100)
+        self.assertEqual(len(records), 400)
+        self.assertLess(duration, 5, 'read %d registry records in %.3f s'
+                        % (len(synthetic), duration))
@@ -0,0 +1,116 @@
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.events
+import fpgaedu.vivado
+
+curr_dir = os.path.dirname(__file__)
+fake_vivado = os.path.join(curr_dir, 'resources', 'fake_vivado.py')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+class PreparedSessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='fpgaedu_test')
+        self.vivado_path = os.path.join(self.directory, 'vivado')
+        with open(self.vivado_path, 'w') as f:
+            f.write('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, fake_vivado))
+        os.chmod(self.vivado_path, stat.S_IRWXU)
+        self.cache_path = os.path.join(self.directory, 'inventory.json')
+        self.sessions = []
+
+    def tearDown(self):
+        for session in self.sessions:
+            session.stop()
+        shutil.rmtree(self.directory)
+
+    def start_session(self, **kwargs):
+        session = fpgaedu.vivado.Session(server_port=free_port(),
+                                         vivado_path=self.vivado_path, **kwargs)
+        self.sessions.append(session)
+        session.start(timeout=10)
+        return session
+
+    def device_enumerations(self, session):
+        return len(session.events.find('getDeviceIdentifiers'))
+
+    def test_tcl_args(self):
+        session = fpgaedu.vivado.Session(server_port=1234, vivado_path='vivado',
+                                         hw_server_url='lab:3121', prepare=True)
+        self.assertEqual(session.tcl_args,
+                         ['-port', '1234', '-hw_server', 'lab:3121', '-prepare'])
+
+    @mock.patch.dict(os.environ, {'FAKE_VIVADO_ENUMERATION_DELAY': '0.2'})
+    def test_cold_and_warm_start(self):
+        cache = fpgaedu.vivado.InventoryCache(self.cache_path)
+
+        start = time.perf_counter()
+        cold = self.start_session(prepare=True, inventory_cache=cache)
+        cold_inventory = cold.get_inventory()
+        cold_duration = time.perf_counter() - start
+
+        # A new cache object reads the entry persisted by the first session
+        cache = fpgaedu.vivado.InventoryCache(self.cache_path)
+
+        start = time.perf_counter()
+        warm = self.start_session(prepare=True, inventory_cache=cache)
+        warm_inventory = warm.get_inventory()
+        warm_duration = time.perf_counter() - start
+
+        self.assertEqual(cold_inventory, warm_inventory)
+        self.assertEqual(self.device_enumerations(cold), 3)
+        self.assertEqual(self.device_enumerations(warm), 0)
+        self.assertEqual(len(warm.events.find('inventory-cache-hit')), 1)
+        self.assertLess(warm_duration, cold_duration,
+                        'cold start: %.3f s, warm start: %.3f s'
+                        % (cold_duration, warm_duration))
+
+    def test_fingerprint_mismatch_enumerates(self):
+        cache = fpgaedu.vivado.InventoryCache()
+        cache.put('localhost/' + fpgaedu.vivado.DEFAULT_HW_SERVER_URL,
+                  fpgaedu.vivado.inventory_fingerprint(['other_target']),
+                  {'other_target': ['xc7a35t_0']})
+        session = self.start_session(inventory_cache=cache)
+        inventory = session.get_inventory()
+        self.assertEqual(len(inventory), 3)
+        self.assertEqual(self.device_enumerations(session), 3)
+
+    @mock.patch.dict(os.environ, {'FAKE_VIVADO_CONNECT_DELAY': '0.5'})
+    def test_prepare_connects_during_startup(self):
+        def first_request(session):
+            session.get_target_identifiers()
+            event, = session.events.find('getTargetIdentifiers')
+            return event['duration']
+
+        unprepared = self.start_session()
+        prepared = self.start_session(prepare=True)
+        # The prepared session pays for the connection before it is ready,
+        # the unprepared session on its first request.
+        prepared_startup, = fpgaedu.events.startup_latencies([prepared.events])
+        self.assertGreaterEqual(prepared_startup, 0.5)
+        self.assertGreaterEqual(first_request(unprepared), 0.5)
+        self.assertLess(first_request(prepared), 0.25)
+
+    def test_hw_server_url(self):
+        session = self.start_session(hw_server_url='lab:3121')
+        targets = session.get_target_identifiers()
+        self.assertEqual(len(targets), 3)
+        self.assertTrue(all(target.startswith('lab:3121/') for target in targets))
+
+    def test_start_polls_until_ready(self):
+        with mock.patch.dict(os.environ, {'FAKE_VIVADO_STARTUP_DELAY': '0.5'}):
+            session = self.start_session()
+        startup, = fpgaedu.events.startup_latencies([session.events])
+        self.assertGreaterEqual(startup, 0.5)
+        self.assertLess(startup, 5)
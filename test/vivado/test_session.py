@@ -19,7 +19,7 @@ class SessionTestCase(unittest.TestCase):
 
     def test_init_tcl_init_script_exists(self):
         session = fpgaedu.vivado.Session()
-        self.assertTrue(os.path.exists(session._vivado_path))
+        self.assertTrue(os.path.exists(fpgaedu.vivado.locate()))
         self.assertTrue(os.path.exists(session._tcl_init_script))
 
     def test_init_server_port_property(self):
@@ -0,0 +1,127 @@
+import base64
+import struct
+import time
+import unittest
+
+import pytest
+
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+
+from test.standin import StandInServer
+
+class FakeDevice:
+    '''
+    Byte-addressable device memory served by the stand-in server.
+    '''
+
+    def __init__(self, size):
+        self.memory = bytearray(size)
+
+    def read_memory(self, params, _):
+        start = params['address']
+        return None, bytes(self.memory[start:start + params['length']])
+
+    def write_memory(self, params, payload):
+        start = params['address']
+        self.memory[start:start + len(payload)] = payload
+        return None, b''
+
+    def read_registers(self, params, _):
+        width = params['width']
+        return None, b''.join(bytes(self.memory[a:a + width])
+                              for a in params['addresses'])
+
+    def write_registers(self, params, payload):
+        width = params['width']
+        for i, address in enumerate(params['addresses']):
+            self.memory[address:address + width] = payload[i * width:(i + 1) * width]
+        return None, b''
+
+    def read_memory_base64(self, params):
+        start = params['address']
+        data = bytes(self.memory[start:start + params['length']])
+        return base64.b64encode(data).decode()
+
+class SessionBulkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice(16 * 1024 * 1024)
+        self.server = StandInServer(
+            methods={'readMemoryBase64': self.device.read_memory_base64},
+            binary_methods={
+                'readMemory': self.device.read_memory,
+                'writeMemory': self.device.write_memory,
+                'readRegisters': self.device.read_registers,
+                'writeRegisters': self.device.write_registers
+            }).start()
+        self.session = fpgaedu.vivado.Session(server_port=self.server.port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_write_read_memory(self):
+        data = bytes(range(256)) * 16
+        self.session.write_memory('target', 'device', 1024, data)
+        self.assertEqual(self.session.read_memory('target', 'device', 1024,
+                                                  len(data)), data)
+        request = self.server.requests[0]
+        self.assertEqual(request['method'], 'writeMemory')
+        self.assertNotIn('bitstream', request['params'])
+
+    def test_write_read_registers(self):
+        addresses = [0, 8, 16, 64]
+        values = [1, 0xdeadbeef, 3, 0xffffffff]
+        self.session.write_registers('target', 'device', addresses, values)
+        self.assertEqual(self.session.read_registers('target', 'device', addresses),
+                         values)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(struct.unpack_from('<I', self.device.memory, 8)[0],
+                         0xdeadbeef)
+
+    def test_read_registers_width(self):
+        self.session.write_registers('target', 'device', [0, 2], [0x1234, 0xabcd],
+                                     width=2)
+        self.assertEqual(self.session.read_registers('target', 'device', [0, 2],
+                                                     width=2), [0x1234, 0xabcd])
+        with self.assertRaises(ValueError):
+            self.session.read_registers('target', 'device', [0], width=3)
+
+    def test_read_registers_numpy(self):
+        numpy = pytest.importorskip('numpy')
+        addresses = numpy.arange(0, 4096, 4)
+        values = numpy.arange(len(addresses), dtype=numpy.uint32)
+        self.session.write_registers('target', 'device', addresses, values)
+        result = self.session.read_registers('target', 'device', addresses,
+                                             as_numpy=True)
+        self.assertEqual(result.dtype, numpy.dtype('<u4'))
+        self.assertTrue((result == values).all())
+
+    def test_read_memory_raises_short_response(self):
+        self.server.binary_methods['readMemory'] = lambda params, _: (None, b'\x00')
+        with self.assertRaises(fpgaedu.jsonrpc2.InvalidResponseError):
+            self.session.read_memory('target', 'device', 0, 16)
+
+    def test_read_memory_throughput(self):
+        '''
+        Benchmark bulk reads over the binary side channel against reads of
+        base64 encoded data embedded in the JSON response.
+        '''
+        length = 8 * 1024 * 1024
+        repeat = 4
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            self.session.read_memory('target', 'device', 0, length)
+        binary_rate = repeat * length / (time.perf_counter() - start) / 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = self.session._rpc_proxy.call(
+                'readMemoryBase64', params={'address': 0, 'length': length})
+            base64.b64decode(result)
+        json_rate = repeat * length / (time.perf_counter() - start) / 1e6
+
+        self.assertGreater(binary_rate, json_rate,
+                           'readMemory: %.1f MB/s binary, %.1f MB/s base64 JSON'
+                           % (binary_rate, json_rate))
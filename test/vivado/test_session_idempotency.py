@@ -0,0 +1,67 @@
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+
+from test.standin import StandInServer
+
+class SessionIdempotencyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.programmed = []
+        self.recent_results = fpgaedu.jsonrpc2.RecentResults()
+
+        def program(params):
+            def execute():
+                time.sleep(0.2)
+                self.programmed.append(params['target'])
+            return self.recent_results.execute(params['idempotencyKey'], execute)
+
+        self.server = StandInServer(methods={'program': program}).start()
+        self.session = fpgaedu.vivado.Session(server_port=self.server.port)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_program_sends_idempotency_key(self):
+        self.session.program('target', 'device', b'bitstream')
+        self.session.program('target', 'device', b'bitstream')
+        keys = {request['params']['idempotencyKey'] for request in self.server.requests}
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(len(self.programmed), 2)
+
+    def test_program_retry_after_dropped_response(self):
+        self.server.drop_responses = 1
+        start = time.perf_counter()
+        self.session.program('target', 'device', b'bitstream', retries=2)
+        duration = time.perf_counter() - start
+
+        self.assertEqual(self.programmed, ['target'])
+        self.assertEqual(len(self.server.requests), 2)
+        first, second = self.server.requests
+        self.assertEqual(first['params']['idempotencyKey'],
+                         second['params']['idempotencyKey'])
+        # The retry costs a round trip, not a second program
+        self.assertLess(duration, 0.35)
+        self.assertEqual(len(self.session.events.find('program-retry')), 1)
+
+    def test_program_explicit_key(self):
+        self.session.program('target', 'device', b'bitstream', idempotency_key='abc')
+        self.session.program('target', 'device', b'bitstream', idempotency_key='abc')
+        self.assertEqual(self.programmed, ['target'])
+
+    def test_program_raises_after_retries(self):
+        self.server.drop_responses = 2
+        with self.assertRaises(fpgaedu.jsonrpc2.EndpointError):
+            self.session.program('target', 'device', b'bitstream', retries=1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_program_does_not_retry_server_errors(self):
+        self.session._rpc_proxy = mock.Mock()
+        self.session._rpc_proxy.call.side_effect = \
+            fpgaedu.jsonrpc2.InternalServerError('failed')
+        with self.assertRaises(fpgaedu.jsonrpc2.InternalServerError):
+            self.session.program('target', 'device', b'bitstream', retries=3)
+        self.assertEqual(self.session._rpc_proxy.call.call_count, 1)
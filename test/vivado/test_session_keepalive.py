@@ -0,0 +1,176 @@
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.jsonrpc2
+import fpgaedu.vivado
+
+from test.standin import StandInServer
+
+class SessionKeepaliveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.hardware_connected = True
+        self.reconnects = 0
+        self.reconnect_fails = False
+
+        def echo(params):
+            result = dict(params)
+            if params.get('probeHardware'):
+                result['hardwareConnected'] = self.hardware_connected
+            return result
+
+        def reconnect_hardware(_):
+            self.reconnects += 1
+            if self.reconnect_fails:
+                raise fpgaedu.jsonrpc2.InternalServerError('no hw_server')
+            self.hardware_connected = True
+            return True
+
+        self.server = StandInServer(methods={
+            'echo': echo,
+            'reconnectHardware': reconnect_hardware,
+            'getTargetIdentifiers': lambda _: ['target_a']
+        }).start()
+        self.session = fpgaedu.vivado.Session(server_port=self.server.port)
+
+    def tearDown(self):
+        self.session.stop()
+        self.server.stop()
+
+    def test_initial_health(self):
+        self.assertEqual(self.session.health, fpgaedu.vivado.HEALTH_UNKNOWN)
+        self.assertIsNone(self.session.last_ok)
+
+    def test_check_health_ok(self):
+        before = time.time()
+        self.assertEqual(self.session.check_health(), fpgaedu.vivado.HEALTH_OK)
+        self.assertGreaterEqual(self.session.last_ok, before)
+        self.assertTrue(self.server.requests[-1]['params']['probeHardware'])
+        self.assertEqual(self.reconnects, 0)
+
+    def test_check_health_reconnects(self):
+        self.session.get_target_identifiers()
+        self.hardware_connected = False
+        self.assertEqual(self.session.check_health(), fpgaedu.vivado.HEALTH_OK)
+        self.assertEqual(self.reconnects, 1)
+        self.assertIsNone(self.session._target_identifiers)
+        self.assertEqual(len(self.session.events.find('hardware-reconnect')), 1)
+
+    def test_check_health_degraded(self):
+        self.hardware_connected = False
+        self.assertEqual(self.session.check_health(reconnect=False),
+                         fpgaedu.vivado.HEALTH_DEGRADED)
+        self.reconnect_fails = True
+        self.assertEqual(self.session.check_health(),
+                         fpgaedu.vivado.HEALTH_DEGRADED)
+        self.assertEqual(self.reconnects, 1)
+        self.assertIsNone(self.session.last_ok)
+
+    def test_check_health_unreachable(self):
+        self.session.check_health()
+        last_ok = self.session.last_ok
+        self.server.stop()
+        self.assertEqual(self.session.check_health(),
+                         fpgaedu.vivado.HEALTH_UNREACHABLE)
+        self.assertEqual(self.session.last_ok, last_ok)
+        states = [event['args']['state'] for event in self.session.events.find('health')]
+        self.assertEqual(states, ['ok', 'unreachable'])
+
+    def test_server_without_probe(self):
+        self.server.methods['echo'] = lambda params: params
+        self.assertEqual(self.session.check_health(), fpgaedu.vivado.HEALTH_OK)
+
+    def test_echo_unchanged(self):
+        self.session.echo()
+        self.assertNotIn('probeHardware', self.server.requests[-1]['params'])
+
+    def test_keepalive_reconnects_proactively(self):
+        self.session.start_keepalive(interval=0.05)
+        time.sleep(0.2)
+        self.assertEqual(self.session.health, fpgaedu.vivado.HEALTH_OK)
+        self.hardware_connected = False
+        time.sleep(0.2)
+        self.assertEqual(self.reconnects, 1)
+        self.assertTrue(self.hardware_connected)
+        self.assertLess(time.time() - self.session.last_ok, 0.2)
+
+        self.session.stop()
+        self.assertEqual(self.session.health, fpgaedu.vivado.HEALTH_UNKNOWN)
+        requests = len(self.server.requests)
+        time.sleep(0.15)
+        self.assertEqual(len(self.server.requests), requests)
+
+    def test_keepalive_suspended_while_in_use(self):
+        checks = []
+        calls = []
+        echo = self.server.methods['echo']
+
+        def timed_echo(params):
+            checks.append(time.perf_counter())
+            return echo(params)
+
+        def slow_targets(_):
+            start = time.perf_counter()
+            time.sleep(0.1)
+            calls.append((start, time.perf_counter()))
+            return ['target_a']
+
+        self.server.methods['echo'] = timed_echo
+        self.server.methods['getTargetIdentifiers'] = slow_targets
+        pool = fpgaedu.vivado.SessionPool(
+            session_factory=lambda server_port: self.session,
+            keepalive_interval=0.01)
+        with mock.patch.object(self.session, 'start'):
+            for _ in range(3):
+                with pool.session() as session:
+                    checked_out = time.perf_counter()
+                    session.get_target_identifiers(refresh=True)
+                    time.sleep(0.05)
+                    session.get_target_identifiers(refresh=True)
+                    returned = time.perf_counter()
+                time.sleep(0.05)
+                self.assertFalse([t for t in checks if checked_out <= t <= returned],
+                                 'health checked while in use')
+        self.assertEqual(len(calls), 6)
+        self.assertTrue(checks)
+
+class SessionPoolKeepaliveTestCase(unittest.TestCase):
+
+    def test_keepalive_started(self):
+        session = mock.MagicMock(health=fpgaedu.vivado.HEALTH_OK)
+        pool = fpgaedu.vivado.SessionPool(
+            session_factory=lambda server_port: session, keepalive_interval=5)
+        with pool.session():
+            pass
+        session.start_keepalive.assert_called_once_with(5)
+
+    def test_unreachable_session_restarted(self):
+        session = mock.MagicMock(health=fpgaedu.vivado.HEALTH_OK)
+        pool = fpgaedu.vivado.SessionPool(
+            session_factory=lambda server_port: session)
+        with pool.session():
+            pass
+        session.health = fpgaedu.vivado.HEALTH_UNREACHABLE
+        with pool.session() as restarted:
+            self.assertIs(restarted, session)
+        session.stop.assert_called_once_with()
+        self.assertEqual(session.start.call_count, 2)
+        self.assertEqual(len(pool.sessions), 1)
+
+class SessionInvalidationTestCase(unittest.TestCase):
+
+    def test_invalidation_after_store(self):
+        session = fpgaedu.vivado.Session()
+        session._rpc_proxy = mock.Mock()
+        session._rpc_proxy.call_iter.return_value = iter(['xc7a100t_0'])
+
+        class InvalidatingDict(dict):
+            # Stands in for the keepalive invalidating the cache right after
+            # the result is stored
+            def __setitem__(self, key, value):
+                super().__setitem__(key, value)
+                session.invalidate_identifiers()
+
+        session._device_identifiers = InvalidatingDict()
+        self.assertEqual(session.get_device_identifiers('target'), ['xc7a100t_0'])
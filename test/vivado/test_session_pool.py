@@ -0,0 +1,151 @@
+import threading
+import time
+import unittest
+import unittest.mock as mock
+
+import fpgaedu.vivado
+
+class SessionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def session_factory(server_port):
+            session = mock.MagicMock()
+            session.server_port = server_port
+            self.created.append(session)
+            return session
+
+        self.session_factory = session_factory
+
+    def test_session_started_lazily_and_reused(self):
+        pool = fpgaedu.vivado.SessionPool(session_factory=self.session_factory)
+        self.assertEqual(len(self.created), 0)
+        with pool.session() as first:
+            pass
+        with pool.session() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        first.start.assert_called_once_with()
+
+    def test_session_ports(self):
+        pool = fpgaedu.vivado.SessionPool(size=2, server_port=4000,
+                                          session_factory=self.session_factory)
+        with pool.session() as first:
+            with pool.session() as second:
+                self.assertEqual({first.server_port, second.server_port},
+                                 {4000, 4001})
+
+    def test_session_blocks_when_exhausted(self):
+        pool = fpgaedu.vivado.SessionPool(size=1, session_factory=self.session_factory)
+        acquired = []
+
+        def acquire():
+            with pool.session() as session:
+                acquired.append(session)
+
+        with pool.session():
+            thread = threading.Thread(target=acquire)
+            thread.start()
+            time.sleep(0.1)
+            self.assertEqual(acquired, [])
+        thread.join(1)
+        self.assertEqual(len(acquired), 1)
+        self.assertEqual(len(self.created), 1)
+
+    def test_failed_start_releases_slot(self):
+        pool = fpgaedu.vivado.SessionPool(size=1, session_factory=self.session_factory)
+        failing = mock.MagicMock()
+        failing.start.side_effect = fpgaedu.vivado.SessionTimeoutError
+        pool._session_factory = lambda server_port: failing
+        with self.assertRaises(fpgaedu.vivado.SessionTimeoutError):
+            with pool.session():
+                pass
+        pool._session_factory = self.session_factory
+        with pool.session() as session:
+            self.assertIs(session, self.created[0])
+
+    def test_close(self):
+        pool = fpgaedu.vivado.SessionPool(session_factory=self.session_factory)
+        with pool.session() as session:
+            pass
+        pool.close()
+        session.stop.assert_called_once_with()
+
+    def test_shared_session(self):
+        pool = fpgaedu.vivado.SessionPool(size=2, shared=True,
+                                          session_factory=self.session_factory)
+        with pool.session() as first:
+            with pool.session() as second:
+                with pool.session() as third:
+                    self.assertIsNot(first, second)
+                    self.assertIn(third, (first, second))
+        with pool.session() as fourth:
+            self.assertIn(fourth, (first, second))
+        self.assertEqual(len(self.created), 2)
+        for session in self.created:
+            session.start.assert_called_once_with()
+
+    def test_shared_session_waits_for_start(self):
+        started = threading.Event()
+        pool = fpgaedu.vivado.SessionPool(
+            shared=True, session_factory=lambda server_port: mock.MagicMock(
+                start=mock.Mock(side_effect=lambda: (time.sleep(0.1),
+                                                     started.set()))))
+        acquired = []
+
+        def acquire():
+            with pool.session() as session:
+                acquired.append((session, started.is_set()))
+
+        threads = [threading.Thread(target=acquire) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(1)
+        (first, first_started), (second, second_started) = acquired
+        self.assertIs(first, second)
+        self.assertTrue(first_started and second_started)
+        first.start.assert_called_once_with()
+
+class SessionDiscoveryCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = fpgaedu.vivado.Session()
+        self.session._rpc_proxy = mock.Mock()
+
+    def test_get_target_identifiers_cached(self):
+        self.session._rpc_proxy.call_iter.return_value = ['target']
+        self.assertEqual(self.session.get_target_identifiers(), ['target'])
+        self.assertEqual(self.session.get_target_identifiers(), ['target'])
+        self.assertEqual(self.session._rpc_proxy.call_iter.call_count, 1)
+        self.session.get_target_identifiers(refresh=True)
+        self.assertEqual(self.session._rpc_proxy.call_iter.call_count, 2)
+
+    def test_get_device_identifiers_cached_per_target(self):
+        self.session._rpc_proxy.call_iter.side_effect = lambda method, params: \
+            [params['targetIdentifier'] + '_device']
+        self.assertEqual(self.session.get_device_identifiers('a'), ['a_device'])
+        self.assertEqual(self.session.get_device_identifiers('b'), ['b_device'])
+        self.assertEqual(self.session.get_device_identifiers('a'), ['a_device'])
+        self.assertEqual(self.session._rpc_proxy.call_iter.call_count, 2)
+
+    def test_stop_invalidates_identifiers(self):
+        self.session._rpc_proxy.call_iter.return_value = ['target']
+        self.session.get_target_identifiers()
+        self.session.stop()
+        self.session.get_target_identifiers()
+        self.assertEqual(self.session._rpc_proxy.call_iter.call_count, 2)
+
+class SessionPoolPortTestCase(unittest.TestCase):
+
+    @mock.patch.object(fpgaedu.vivado.Session, 'start')
+    def test_sessions_pass_own_port(self, _):
+        pool = fpgaedu.vivado.SessionPool(
+            size=2, server_port=4000,
+            session_factory=lambda server_port: fpgaedu.vivado.Session(
+                server_port=server_port, vivado_path='vivado'))
+        with pool.session() as first, pool.session() as second:
+            self.assertEqual(first.tcl_args[:2], ['-port', '4000'])
+            self.assertEqual(second.tcl_args[:2], ['-port', '4001'])